@@ -1,10 +1,11 @@
 import json
-import re
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from collections import defaultdict
 
+import entity_matcher
+
 # --- CONFIGURATION ---
 INPUT_FILE = "results/gpt-5.1_gpt-5-mini_gpt-5-nano_llama-4-scout_mistral_gemini-3.0-flash_gemini-2.5-flash.json"
 RESULTS_FILE = "results/final_scorecard_mega.json"
@@ -15,23 +16,9 @@ embedder = SentenceTransformer('all-MiniLM-L6-v2')
 def extract_key_entities(text):
     """
     Extracts dates, dollar amounts, and specific numbers for rigorous matching.
+    Entities are normalized ("October 1st" -> "oct 1", "$2,500.00" -> "$2500"), see entity_matcher.py.
     """
-    if not text: return set()
-    # Regex for dates (Oct 1, October 1st), Money ($2,500), Numbers (1/60th, 30 days)
-    patterns = [
-        r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s\d{1,2}(st|nd|rd|th)?\b', # Dates
-        r'\$\d+(?:,\d{3})*(?:\.\d{2})?', # Money
-        r'\b\d+[\/-]\d+(?:th)?\b', # Fractions like 1/60th
-        r'\b\d+\s(days|years|months)\b' # Durations
-    ]
-    entities = set()
-    for p in patterns:
-        matches = re.findall(p, text, re.IGNORECASE)
-        # Flatten and clean matches
-        for m in matches:
-            if isinstance(m, tuple): m = " ".join(m)
-            entities.add(m.lower().strip())
-    return entities
+    return entity_matcher.extract_entities(text)
 
 def calculate_scores(ground_truth, model_response):
     scores = {}
@@ -43,14 +30,9 @@ def calculate_scores(ground_truth, model_response):
     
     # 2. KEY ENTITY RECALL (0.0 - 1.0)
     # Did the model include the specific numbers/dates from Ground Truth?
+    # Entities are normalized, so "Oct 1" matches "October 1st" and "$2500" matches "$2,500"
     gt_entities = extract_key_entities(ground_truth)
-    if not gt_entities:
-        scores['entity_recall'] = 1.0 # No entities to miss
-    else:
-        model_text_lower = model_response.lower()
-        # Check how many GT entities appear in Model Text
-        hits = sum(1 for e in gt_entities if e in model_text_lower) # Simple string match for speed
-        scores['entity_recall'] = hits / len(gt_entities)
+    scores['entity_recall'] = entity_matcher.entity_recall(gt_entities, model_response)
         
     return scores
 
@@ -87,6 +69,14 @@ def main():
         print(f"{model:<15} | {avg_semantic:.4f}     | {avg_recall:.4f}")
         
     print("="*40)
+
+    summary = {
+        model: {'semantic': float(np.mean(scores['semantic'])), 'recall': float(np.mean(scores['recall']))}
+        for model, scores in final_report.items()
+    }
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(summary, f, indent=4)
+    print(f"Saved scorecard to {RESULTS_FILE}")
     print("\nNOTE: Low 'Fact Recall' on highly accurate models (like GPT-5.1)")
     print("    may indicate the Model knows NEWER laws than your Old PDF.")
 
@@ -0,0 +1,106 @@
+import json
+import re
+import time
+
+import entity_matcher
+
+# --- CONFIGURATION ---
+INPUT_FILE = "results/gpt-5.1_gpt-5-mini_gpt-5-nano_llama-4-scout_mistral_gemini-3.0-flash_gemini-2.5-flash.json"
+REPEATS = 20 # Passes over the whole results file per implementation
+RICH_ENTITY_COUNT = 40 # Synthetic "long answer key" case
+
+# --- 1. LEGACY IMPLEMENTATION (as originally in ai_leaderboard.py) ---
+LEGACY_PATTERNS = [
+    r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s\d{1,2}(st|nd|rd|th)?\b', # Dates
+    r'\$\d+(?:,\d{3})*(?:\.\d{2})?', # Money
+    r'\b\d+[\/-]\d+(?:th)?\b', # Fractions like 1/60th
+    r'\b\d+\s(days|years|months)\b' # Durations
+]
+
+def legacy_extract(text):
+    if not text: return set()
+    entities = set()
+    for p in LEGACY_PATTERNS:
+        for m in re.findall(p, text, re.IGNORECASE):
+            if isinstance(m, tuple): m = " ".join(m)
+            entities.add(m.lower().strip())
+    return entities
+
+def legacy_recall(gt_entities, response):
+    if not gt_entities:
+        return 1.0
+    model_text_lower = response.lower()
+    return sum(1 for e in gt_entities if e in model_text_lower) / len(gt_entities)
+
+# Spellings the extractor accepts; an answer key must always fully match itself
+SELF_MATCH_CASES = [
+    "Rent due Sept. 5.",
+    "A deposit of $ 2,500 is the limit.",
+    "Starting October  1 the lease renews.",
+    "Respond within 10\tdays.",
+    "Late fee: $2,500.5 per month.",
+    "Pay by oct 1 days after notice, 1/60th of the rent, a ten-day cure period.",
+]
+
+# --- HELPERS ---
+def time_it(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        out = fn()
+    return (time.perf_counter() - start) / REPEATS, out
+
+def print_row(label, seconds, baseline):
+    print(f"{label:<40} | {seconds * 1000:8.2f} ms  | {baseline / seconds:6.2f}x")
+
+def check_self_match(texts):
+    """Every text must get recall 1.0 against its own entities. Returns the texts that do not."""
+    return [t for t in texts if entity_matcher.entity_recall(entity_matcher.extract_entities(t), t) != 1.0]
+
+# --- MAIN ---
+def main():
+    with open(INPUT_FILE, 'r') as f:
+        data = json.load(f)
+    pairs = [(item['ground_truth'], resp) for item in data for resp in item['responses'].values()]
+    chars = sum(len(resp) for _, resp in pairs)
+    print(f"Benchmarking {len(pairs)} (question, model) pairs, {chars / 1e6:.2f}M response chars, {REPEATS} repeats...")
+
+    # Like for like: answer keys are extracted once per question on both sides (as gt_index does);
+    # the per-pair work is everything done with the response
+    answer_keys = sorted({gt for gt, _ in pairs})
+    legacy_setup_s, legacy_keys = time_it(lambda: {gt: legacy_extract(gt) for gt in answer_keys})
+    new_setup_s, new_keys = time_it(lambda: {gt: entity_matcher.extract_entities(gt) for gt in answer_keys})
+    legacy_s, legacy_scores = time_it(lambda: [legacy_recall(legacy_keys[gt], resp) for gt, resp in pairs])
+    new_s, new_scores = time_it(lambda: [entity_matcher.entity_recall(new_keys[gt], resp) for gt, resp in pairs])
+
+    print(f"\n{'IMPLEMENTATION':<40} | {'TIME / PASS':<12} | {'SPEEDUP':<8}")
+    print("-" * 68)
+    print_row("legacy recall (substring per entity)", legacy_s, legacy_s)
+    print_row("normalized recall (extract response)", new_s, legacy_s)
+    print(f"One-time answer-key extraction for {len(answer_keys)} questions: "
+          f"legacy {legacy_setup_s * 1000:.2f} ms, normalized {new_setup_s * 1000:.2f} ms")
+
+    # B. Rich entity sets: legacy scans once per entity, the normalized path once per response
+    rich = {f"{d} days" for d in range(1, RICH_ENTITY_COUNT + 1)}
+    responses = [resp for _, resp in pairs]
+    legacy_rich_s, _ = time_it(lambda: [legacy_recall(rich, r) for r in responses])
+    new_rich_s, _ = time_it(lambda: [entity_matcher.entity_recall(rich, r) for r in responses])
+
+    print(f"\n{RICH_ENTITY_COUNT} entities per answer key:")
+    print("-" * 68)
+    print_row("legacy substring scans", legacy_rich_s, legacy_rich_s)
+    print_row("normalized recall (extract response)", new_rich_s, legacy_rich_s)
+
+    # C. Matching uses the extraction grammar, so an answer key always matches itself
+    failures = check_self_match(SELF_MATCH_CASES + answer_keys)
+    print(f"\nSelf-match recall 1.0 on {len(SELF_MATCH_CASES) + len(answer_keys) - len(failures)}"
+          f"/{len(SELF_MATCH_CASES) + len(answer_keys)} texts.")
+    for t in failures:
+        print(f"  ✗ {t!r}")
+
+    changed = sum(1 for a, b in zip(legacy_scores, new_scores) if abs(a - b) > 1e-9)
+    print(f"Recall changed on {changed}/{len(pairs)} pairs (normalized matches such as 'Oct 1' vs 'October 1st').")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
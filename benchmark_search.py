@@ -0,0 +1,74 @@
+import glob
+import json
+import os
+
+import numpy as np
+
+import ai_leaderboard as core # embedder
+import gt_index
+
+# --- CONFIGURATION ---
+DATA_DIR = gt_index.DATA_DIR
+RESULTS_DIR = "results"
+MATCH_THRESHOLD = 0.75 # Cosine similarity above which a typed question counts as "the same" benchmark item
+# Rows carrying these keys come from the non-standard modes (multi-turn / retrieval-augmented,
+# temperature sampling); their `responses` are not comparable benchmark answers
+NON_STANDARD_KEYS = ("followups", "context_pages", "samples")
+
+# --- HELPER FUNCTIONS ---
+
+def load_stored_answers(results_dir=RESULTS_DIR):
+    """{item_key: {model: answer}} from every standard results file (scorecards, caches and other modes are skipped)."""
+    answers = {}
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json"))):
+        try:
+            with open(path, "r") as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(rows, list) or not rows or "responses" not in rows[0]:
+            continue
+        if any(key in rows[0] for key in NON_STANDARD_KEYS):
+            continue
+        for row in rows:
+            key = gt_index.item_key(row["question"], row["ground_truth"], row.get("citation", ""))
+            stored = answers.setdefault(key, {})
+            for model, answer in row["responses"].items():
+                if answer and not answer.startswith("[ERROR]"):
+                    stored.setdefault(model, answer)
+    return answers
+
+class BenchmarkIndex:
+    """
+    In-memory vector index over every benchmark question in data/*.json.
+    Built from the cached ground-truth indexes, so no question is re-embedded.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, results_dir=RESULTS_DIR):
+        self.items = []
+        vectors = []
+        for key, features in gt_index.load_all_indexes(data_dir).items():
+            self.items.append({
+                "key": key,
+                "question": features["question"],
+                "ground_truth": features["ground_truth"],
+                "citation": features["citation"],
+            })
+            vectors.append(features["question_embedding"])
+        self.matrix = np.asarray(vectors, dtype=np.float32)
+        self.answers = load_stored_answers(results_dir)
+
+    def search(self, question, k=3):
+        """The `k` closest benchmark items to `question`, each with its cosine similarity."""
+        if not self.items or not question.strip():
+            return []
+        query = core.embedder.encode([question], normalize_embeddings=True)[0].astype(np.float32)
+        sims = self.matrix @ query # Rows are normalized: dot product == cosine similarity
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [{**self.items[i], "similarity": float(sims[i])} for i in top]
+
+    def stored_answers(self, item):
+        """Answers already recorded in results/ for this benchmark item."""
+        return self.answers.get(item["key"], {})
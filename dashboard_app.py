@@ -4,11 +4,18 @@ import pandas as pd
 
 import inference_engine_mega as eng
 import ai_leaderboard_extended as lb  # uses your scoring functions
+import benchmark_search as bs  # nearest benchmark question + stored answers
 
 
 st.set_page_config(page_title="Legal AI Dashboard", layout="wide")
 
 
+@st.cache_resource(show_spinner="Loading benchmark index...")
+def load_benchmark_index():
+    """Built once per Streamlit process from the cached embeddings in data/."""
+    return bs.BenchmarkIndex()
+
+
 def run_all_models(question: str):
     """Run the exact same inference calls & rate limits as inference_engine_mega.py."""
     outputs = {}
@@ -74,20 +81,58 @@ def main():
         placeholder="e.g., My landlord won’t return my security deposit in NYC. What can I do?",
     )
 
-    col1, col2 = st.columns([1, 3], vertical_alignment="center")
+    # Nearest benchmark item: offers its answer key as the reference and its stored answers
+    match, stored = None, {}
+    if question.strip():
+        index = load_benchmark_index()
+        matches = index.search(question, k=3)
+        if matches:
+            match = matches[0]
+            stored = index.stored_answers(match)
+            with st.expander(f"📚 Closest benchmark question (similarity {match['similarity']:.2f})", expanded=True):
+                st.markdown(f"**{match['question']}**")
+                st.markdown(f"*Answer key:* {match['ground_truth']}")
+                st.caption(f"Citation: {match['citation']}")
+                use_match = st.checkbox(
+                    "Use this answer key as the grounding reference",
+                    value=match["similarity"] >= bs.MATCH_THRESHOLD,
+                    disabled=bool(gt_text),
+                    help="A reference pasted in the sidebar takes precedence.",
+                )
+                if use_match and not gt_text:
+                    gt_text = f"{match['ground_truth']} {match['citation']}"
+                for other in matches[1:]:
+                    st.caption(f"Also close ({other['similarity']:.2f}): {other['question']}")
+
+    col1, col2, col3 = st.columns([1, 1, 2], vertical_alignment="center")
     with col1:
         run_btn = st.button("Run all models", type="primary", use_container_width=True)
 
     with col2:
+        # Stored answers belong to the benchmark question, so only offer them for a close match
+        same_question = match is not None and match["similarity"] >= bs.MATCH_THRESHOLD
+        stored_btn = st.button(
+            f"Show stored answers ({len(stored) if same_question else 0})",
+            disabled=not (stored and same_question),
+            use_container_width=True,
+            help=f"Answers already recorded in results/ for the closest benchmark question "
+                 f"(similarity ≥ {bs.MATCH_THRESHOLD}). No API calls.",
+        )
+
+    with col3:
         st.caption("Note: Duke/Gemini calls may take time due to rate limits.")
 
-    if run_btn:
+    if run_btn or stored_btn:
         if not question.strip():
             st.warning("Please enter a question.")
             st.stop()
 
-        with st.spinner("Calling models (may take a while)..."):
-            outputs = run_all_models(question)
+        if stored_btn:
+            outputs = dict(stored)
+            question = match["question"] # The answers were given to the benchmark wording
+        else:
+            with st.spinner("Calling models (may take a while)..."):
+                outputs = run_all_models(question)
 
         # Save to session so leaderboard tab persists
         st.session_state["last_question"] = question
@@ -0,0 +1,582 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import inference_engine_mega as eng
+
+# --- CONFIGURATION ---
+
+# 1. FILES
+INPUT_FILE = eng.INPUT_FILE
+OUTPUT_FILE = eng.OUTPUT_FILE
+# Shard queue shared by the coordinator and every worker. For workers on other machines,
+# put it on a shared disk with working file locks (SQLite does not lock reliably over NFS).
+QUEUE_DB = "results/shards.db"
+
+# 2. SHARDING
+SHARD_SIZE = 10 # questions per (model, shard)
+LEASE_SECONDS = 300 # A shard whose worker stops renewing for this long is handed to another worker
+MAX_ATTEMPTS = 3 # Leases per shard before it is marked failed, and calls per (question, model) before giving up on it
+RETRY_DELAY = 60 # seconds before a shard with failed questions is handed out again
+POLL_INTERVAL = 5 # seconds an idle worker waits before asking again
+
+# 3. PROVIDERS
+# max_leases: inference shards of one provider in flight at once, across ALL workers.
+# The per-call delays already use the whole Duke / Gemini quota for one stream, so more
+# workers only add parallelism across providers and for Ollama (each node has its own).
+PROVIDERS = {
+    "duke": {"models": eng.DUKE_MODELS, "call": eng.get_duke_response, "delay": eng.DELAY_DUKE, "max_leases": 1},
+    "gemini": {"models": eng.GEMINI_MODELS, "call": eng.get_gemini_response, "delay": eng.DELAY_GEMINI, "max_leases": 1},
+    "ollama": {"models": eng.LOCAL_MODELS, "call": eng.get_ollama_response, "delay": 0, "max_leases": None},
+}
+
+INFER = "infer"
+SCORE = "score"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    stage TEXT NOT NULL,          -- infer | score
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    question_ids TEXT NOT NULL,   -- JSON list
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    retry_after REAL,             -- not claimable before this time (failed questions to retry)
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS answers (
+    question_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    PRIMARY KEY (question_id, model)
+);
+CREATE TABLE IF NOT EXISTS errors (
+    question_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    attempts INTEGER NOT NULL,    -- failed calls so far; given up at MAX_ATTEMPTS
+    error TEXT NOT NULL,          -- the last "[ERROR] ..." reply
+    PRIMARY KEY (question_id, model)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    pair_key TEXT PRIMARY KEY,    -- evaluation_engine.pair_key
+    entry TEXT NOT NULL           -- JSON {metric@vN: score}, same shape as the score cache
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,         -- input_sha256 | models
+    value TEXT NOT NULL           -- JSON
+);
+"""
+TABLES = ("shards", "answers", "errors", "scores", "meta")
+FINGERPRINT_LABELS = {"input_sha256": "input file", "models": "model list"}
+
+class LeaseLost(Exception):
+    """The shard was handed to another worker after our lease expired."""
+
+# --- 1. THE SHARD QUEUE ---
+
+def connect(path=None):
+    # Autocommit mode; claims and completions open their own IMMEDIATE transactions
+    conn = sqlite3.connect(path or QUEUE_DB, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    if "retry_after" not in [col[1] for col in conn.execute("PRAGMA table_info(shards)")]:
+        conn.execute("ALTER TABLE shards ADD COLUMN retry_after REAL") # Queues created before per-question retries
+    return conn
+
+def queue_fingerprint():
+    """What the shards were built from: question ids are positions in INPUT_FILE, shards are per model."""
+    with open(INPUT_FILE, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"input_sha256": digest, "models": [m for cfg in PROVIDERS.values() for m in cfg["models"]]}
+
+def fingerprint_changes(conn):
+    """Keys of the fingerprint that differ from the ones the queue was built with (all of them for an older queue)."""
+    stored = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+    return [key for key, value in queue_fingerprint().items() if stored.get(key) != value]
+
+def describe_changes(changes):
+    return " and ".join(FINGERPRINT_LABELS[key] for key in changes)
+
+def provider_of(model):
+    for name, cfg in PROVIDERS.items():
+        if model in cfg["models"]:
+            return name
+    raise ValueError(f"Unknown model: {model}")
+
+def add_shards(conn, stage, model, question_ids):
+    for start in range(0, len(question_ids), SHARD_SIZE):
+        conn.execute(
+            "INSERT INTO shards (stage, provider, model, question_ids, status) VALUES (?, ?, ?, ?, ?)",
+            (stage, provider_of(model), model, json.dumps(question_ids[start:start + SHARD_SIZE]), PENDING),
+        )
+
+def claim_shard(conn, worker, stages):
+    """Leases the oldest available shard of `stages` (respecting provider limits), or returns None."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Expired leases that used up their attempts will never be picked again
+        conn.execute(
+            "UPDATE shards SET status = ?, error = COALESCE(error, 'lease expired') "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, LEASED, now, MAX_ATTEMPTS),
+        )
+        in_flight = dict(conn.execute(
+            "SELECT provider, COUNT(*) FROM shards WHERE stage = ? AND status = ? AND lease_expires >= ? GROUP BY provider",
+            (INFER, LEASED, now),
+        ).fetchall())
+
+        marks = ",".join("?" * len(stages))
+        candidates = conn.execute(
+            f"SELECT id, stage, provider, model, question_ids FROM shards "
+            f"WHERE stage IN ({marks}) AND ((status = ? AND COALESCE(retry_after, 0) <= ?) "
+            f"OR (status = ? AND lease_expires < ?)) ORDER BY id",
+            (*stages, PENDING, now, LEASED, now),
+        ).fetchall()
+
+        for shard_id, stage, provider, model, question_ids in candidates:
+            limit = PROVIDERS[provider]["max_leases"]
+            if stage == INFER and limit is not None and in_flight.get(provider, 0) >= limit:
+                continue
+            conn.execute(
+                "UPDATE shards SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (LEASED, worker, now + LEASE_SECONDS, shard_id),
+            )
+            conn.execute("COMMIT")
+            return {"id": shard_id, "stage": stage, "provider": provider, "model": model,
+                    "question_ids": json.loads(question_ids)}
+        conn.execute("COMMIT")
+        return None
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def renew_lease(conn, shard, worker):
+    updated = conn.execute(
+        "UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+        (time.time() + LEASE_SECONDS, shard["id"], worker, LEASED),
+    ).rowcount
+    if not updated:
+        raise LeaseLost(f"shard {shard['id']}")
+
+def complete_shard(conn, shard, worker, error=None):
+    """
+    Marks the shard done; a finished inference shard queues the matching scoring shard.
+    `error` notes the questions that were given up on (they are left out of scoring).
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        updated = conn.execute(
+            "UPDATE shards SET status = ?, lease_expires = NULL, error = ? WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, error, shard["id"], worker, LEASED),
+        ).rowcount
+        if updated and shard["stage"] == INFER:
+            add_shards(conn, SCORE, shard["model"], shard["question_ids"])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def release_shard(conn, shard, worker, error):
+    """Gives the shard back after a failure (or marks it failed once it is out of attempts)."""
+    conn.execute(
+        "UPDATE shards SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+        "lease_expires = NULL, error = ? WHERE id = ? AND worker = ?",
+        (MAX_ATTEMPTS, FAILED, PENDING, str(error)[:500], shard["id"], worker),
+    )
+
+def retry_shard(conn, shard, worker, error):
+    """Puts the shard back after RETRY_DELAY to re-ask its failed questions. Not counted as a failed lease."""
+    conn.execute(
+        "UPDATE shards SET status = ?, lease_expires = NULL, retry_after = ?, attempts = attempts - 1, error = ? "
+        "WHERE id = ? AND worker = ? AND status = ?",
+        (PENDING, time.time() + RETRY_DELAY, str(error)[:500], shard["id"], worker, LEASED),
+    )
+
+def open_shards(conn, stages):
+    """Shards that may still produce work for a worker handling `stages`."""
+    # Scoring shards are created as inference shards finish
+    watched = set(stages) | ({INFER} if SCORE in stages else set())
+    marks = ",".join("?" * len(watched))
+    return conn.execute(
+        f"SELECT COUNT(*) FROM shards WHERE stage IN ({marks}) AND status IN (?, ?)",
+        (*watched, PENDING, LEASED),
+    ).fetchone()[0]
+
+# --- 2. COORDINATOR ---
+
+def load_questions():
+    with open(INPUT_FILE, "r") as f:
+        return json.load(f)
+
+def reset_queue(conn):
+    for table in TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.executescript(SCHEMA)
+
+def init_queue(conn, questions, reset=False):
+    """
+    Splits the (question, model) space into shards. Answers from an earlier run are
+    loaded into the queue and only sent to scoring. An existing queue is resumed if it was
+    built from the same input file and models; otherwise it is only rebuilt with `reset`.
+    Returns False if the queue is stale and was left alone.
+    """
+    if conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+        changes = fingerprint_changes(conn)
+        if not changes:
+            print(f"🔁 Resuming existing queue {QUEUE_DB}")
+            return True
+        if not reset:
+            print(f"⛔ {QUEUE_DB} was built for a different {describe_changes(changes)}. Run `merge` to keep its "
+                  f"answers (if the input is unchanged), then `init --reset` to rebuild it.")
+            return False
+        print(f"🗑️ Rebuilding {QUEUE_DB} (changed: {describe_changes(changes)})")
+    if reset:
+        reset_queue(conn)
+
+    results = eng.load_existing_results(questions, OUTPUT_FILE)
+    conn.execute("BEGIN IMMEDIATE")
+    for cfg in PROVIDERS.values():
+        for model in cfg["models"]:
+            answered = [row["question_id"] for row in results if eng.is_answered(row["responses"].get(model))]
+            pending = [row["question_id"] for row in results if not eng.is_answered(row["responses"].get(model))]
+            conn.executemany(
+                "INSERT OR REPLACE INTO answers (question_id, model, answer) VALUES (?, ?, ?)",
+                [(qid, model, results[qid]["responses"][model]) for qid in answered],
+            )
+            add_shards(conn, INFER, model, pending)
+            add_shards(conn, SCORE, model, answered)
+    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     [(key, json.dumps(value)) for key, value in queue_fingerprint().items()])
+    conn.execute("COMMIT")
+    return True
+
+def build_gt_indexes():
+    # Build missing ground-truth indexes once here, not concurrently in every worker
+    import gt_index
+    gt_index.load_all_indexes()
+
+def print_status(conn):
+    print(f"{'STAGE':<6} | {'PENDING':<7} | {'LEASED':<6} | {'DONE':<6} | {'FAILED':<6}")
+    print("-" * 44)
+    counts = {}
+    for stage, status, n in conn.execute("SELECT stage, status, COUNT(*) FROM shards GROUP BY stage, status"):
+        counts.setdefault(stage, {})[status] = n
+    for stage in (INFER, SCORE):
+        c = counts.get(stage, {})
+        print(f"{stage:<6} | {c.get(PENDING, 0):<7} | {c.get(LEASED, 0):<6} | {c.get(DONE, 0):<6} | {c.get(FAILED, 0):<6}")
+    for shard_id, stage, model, error in conn.execute(
+            "SELECT id, stage, model, error FROM shards WHERE status = ?", (FAILED,)):
+        print(f"  ✗ shard {shard_id} ({stage}, {model}): {error}")
+    for qid, model, attempts, error in conn.execute(
+            "SELECT question_id, model, attempts, error FROM errors ORDER BY model, question_id"):
+        state = "given up" if attempts >= MAX_ATTEMPTS else "will retry"
+        print(f"  ✗ question {qid} ({model}, {attempts} failed calls, {state}): {error[:120]}")
+
+def merge(conn, questions):
+    """Writes the standard results file and the consolidated scorecard from the queue's partial results."""
+    if "input_sha256" in fingerprint_changes(conn):
+        print(f"⛔ {QUEUE_DB} was built from a different {INPUT_FILE}; its question ids do not match. Nothing merged.")
+        return
+
+    import evaluation_engine as ev
+    import gt_index
+
+    results = eng.load_existing_results(questions, OUTPUT_FILE)
+    for qid, model, answer in conn.execute("SELECT question_id, model, answer FROM answers"):
+        results[qid]["responses"][model] = answer
+    with open(OUTPUT_FILE, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"✅ Results saved to {OUTPUT_FILE}")
+
+    # Worker scores go into the shared score cache; evaluate() then only computes what no worker did
+    cache = ev.load_score_cache()
+    for key, entry in conn.execute("SELECT pair_key, entry FROM scores"):
+        cache.setdefault(key, {}).update(json.loads(entry))
+    rows = ev.evaluate(results, cache=cache, index=gt_index.load_all_indexes())
+    ev.save_score_cache(cache)
+
+    leaderboard = ev.aggregate(rows)
+    ev.print_scorecard(leaderboard)
+    ev.save_scorecard(rows, leaderboard, input_file=OUTPUT_FILE)
+    print(f"\n✅ Scorecard saved to {ev.OUTPUT_FILE}")
+
+# --- 3. WORKER ---
+
+def run_infer_shard(conn, shard, questions, worker):
+    """
+    Asks every unanswered question of the shard, storing each answer as it arrives.
+    A failed call is recorded in `errors` and the shard moves on to the next question.
+    Returns (question ids to retry, question ids given up on after MAX_ATTEMPTS failed calls).
+    """
+    cfg = PROVIDERS[shard["provider"]]
+    model = shard["model"]
+    retry, given_up = [], []
+    for qid in shard["question_ids"]:
+        existing = conn.execute(
+            "SELECT answer FROM answers WHERE question_id = ? AND model = ?", (qid, model)).fetchone()
+        if existing and eng.is_answered(existing[0]):
+            continue # Answered by an earlier lease of this shard
+        failed = conn.execute(
+            "SELECT attempts FROM errors WHERE question_id = ? AND model = ?", (qid, model)).fetchone()
+        if failed and failed[0] >= MAX_ATTEMPTS:
+            given_up.append(qid)
+            continue
+
+        answer = cfg["call"](questions[qid]["question"], model)
+        time.sleep(cfg["delay"])
+        if eng.is_answered(answer):
+            conn.execute("INSERT OR REPLACE INTO answers (question_id, model, answer) VALUES (?, ?, ?)",
+                         (qid, model, answer))
+            conn.execute("DELETE FROM errors WHERE question_id = ? AND model = ?", (qid, model))
+        else:
+            # The helpers report failures as "[ERROR] ..." strings (None if a provider sent nothing)
+            attempts = (failed[0] if failed else 0) + 1
+            conn.execute("INSERT OR REPLACE INTO errors (question_id, model, attempts, error) VALUES (?, ?, ?, ?)",
+                         (qid, model, attempts, str(answer)[:500]))
+            (given_up if attempts >= MAX_ATTEMPTS else retry).append(qid)
+        renew_lease(conn, shard, worker)
+    return retry, given_up
+
+def run_score_shard(conn, shard, questions, scorer):
+    """Scores the shard's answers with every registered metric."""
+    ev, base_cache, index = scorer
+    model = shard["model"]
+    marks = ",".join("?" * len(shard["question_ids"]))
+    answers = dict(conn.execute(
+        f"SELECT question_id, answer FROM answers WHERE model = ? AND question_id IN ({marks})",
+        (model, *shard["question_ids"]),
+    ).fetchall())
+    data = [eng.build_row(qid, questions[qid], {model: answers[qid]}) for qid in shard["question_ids"] if qid in answers]
+
+    # Start from this machine's score cache (read-only), keep only this shard's pairs
+    shard_cache = {}
+    for row in data:
+        key = ev.pair_key(row, row["responses"][model])
+        shard_cache[key] = dict(base_cache.get(key, {}))
+    ev.evaluate(data, cache=shard_cache, index=index)
+    conn.executemany("INSERT OR REPLACE INTO scores (pair_key, entry) VALUES (?, ?)",
+                     [(key, json.dumps(entry)) for key, entry in shard_cache.items()])
+
+def run_worker(stages=(INFER, SCORE)):
+    """Claims and runs shards until the queue has nothing left for this worker."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect()
+    questions = load_questions()
+    changes = fingerprint_changes(conn)
+    if changes:
+        print(f"⛔ {QUEUE_DB} was built for a different {describe_changes(changes)} than this worker has. Not starting.")
+        return
+    scorer = None # (evaluation_engine, score cache, gt indexes), loaded on the first scoring shard
+    finished = 0
+
+    print(f"👷 Worker {worker} started ({', '.join(stages)})")
+    while True:
+        shard = claim_shard(conn, worker, stages)
+        if shard is None:
+            if not open_shards(conn, stages):
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        try:
+            error = None
+            if shard["stage"] == INFER:
+                retry, given_up = run_infer_shard(conn, shard, questions, worker)
+                if retry:
+                    retry_shard(conn, shard, worker, f"retrying questions {retry}")
+                    print(f"🔁 Shard {shard['id']} ({shard['model']}): {len(retry)} failed questions, retrying in {RETRY_DELAY}s")
+                    continue
+                if given_up:
+                    error = f"gave up on questions {given_up} after {MAX_ATTEMPTS} failed calls"
+            else:
+                if scorer is None:
+                    import evaluation_engine as ev # Loads the embedder
+                    import gt_index
+                    scorer = (ev, ev.load_score_cache(), gt_index.load_all_indexes())
+                run_score_shard(conn, shard, questions, scorer)
+            complete_shard(conn, shard, worker, error)
+            finished += 1
+        except LeaseLost:
+            print(f"⚠️ Lost the lease on shard {shard['id']}; another worker took it over.")
+        except Exception as e:
+            print(f"⚠️ Shard {shard['id']} ({shard['stage']}, {shard['model']}) failed: {e}")
+            release_shard(conn, shard, worker, e)
+
+    print(f"✅ Worker {worker} done ({finished} shards).")
+
+# --- 4. SELF-TEST ---
+# Runs real worker processes on a throwaway queue with fake providers, then checks the
+# lease, expiry and retry bookkeeping. No API calls are made.
+
+SELFTEST_QUESTIONS = 24
+SELFTEST_DIR = None
+
+def selftest_call(question, model):
+    """Fake provider: "REFUSE" questions always fail, "FLAKY" ones fail on their first call only."""
+    start = time.time()
+    time.sleep(0.05)
+    answer = f"Selftest answer to: {question}"
+    if "REFUSE" in question:
+        answer = "[ERROR] Selftest refusal"
+    elif "FLAKY" in question:
+        marker = os.path.join(SELFTEST_DIR, hashlib.sha256(f"{question}|{model}".encode()).hexdigest()[:16])
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL)) # Atomic across worker processes
+            answer = "[ERROR] Selftest flake"
+        except FileExistsError:
+            pass
+    with open(os.path.join(SELFTEST_DIR, "calls.jsonl"), "a") as f:
+        f.write(json.dumps([provider_of(model), model, question, start, time.time()]) + "\n")
+    return answer
+
+def use_selftest_config(workdir):
+    global INPUT_FILE, OUTPUT_FILE, QUEUE_DB, PROVIDERS, RETRY_DELAY, POLL_INTERVAL, SELFTEST_DIR
+    SELFTEST_DIR = workdir
+    INPUT_FILE = os.path.join(workdir, "questions.json")
+    OUTPUT_FILE = os.path.join(workdir, "results.json")
+    QUEUE_DB = os.path.join(workdir, "shards.db")
+    RETRY_DELAY = 0.5
+    POLL_INTERVAL = 0.2
+    PROVIDERS = {
+        "duke": {"models": ["selftest-a", "selftest-b"], "call": selftest_call, "delay": 0, "max_leases": 1},
+        "ollama": {"models": ["selftest-local"], "call": selftest_call, "delay": 0, "max_leases": None},
+    }
+
+def run_selftest(n_workers):
+    """Returns True if every check passed."""
+    workdir = tempfile.mkdtemp(prefix="shards-selftest-")
+    use_selftest_config(workdir)
+    questions = [
+        {"question": f"Question {i}" + (" REFUSE" if i == 3 else "") + (" FLAKY" if i == 5 else ""),
+         "ground_truth_answer": "n/a"}
+        for i in range(SELFTEST_QUESTIONS)
+    ]
+    with open(INPUT_FILE, "w") as f:
+        json.dump(questions, f)
+    models = [m for cfg in PROVIDERS.values() for m in cfg["models"]]
+
+    conn = connect()
+    init_queue(conn, questions)
+    # A worker that died holding a lease: its shard must be taken over once the lease expires
+    ghost = claim_shard(conn, "ghost", (INFER,))
+    conn.execute("UPDATE shards SET lease_expires = ? WHERE id = ?", (time.time() - 1, ghost["id"]))
+
+    print(f"🧪 Running {n_workers} workers on {QUEUE_DB}")
+    code = f"import distributed as d; d.use_selftest_config({workdir!r}); d.run_worker(({INFER!r},))"
+    here = os.path.dirname(os.path.abspath(__file__))
+    procs = [subprocess.Popen([sys.executable, "-c", code], cwd=here) for _ in range(n_workers)]
+    for p in procs:
+        p.wait()
+
+    with open(os.path.join(workdir, "calls.jsonl"), "r") as f:
+        calls = [json.loads(line) for line in f]
+    per_pair = Counter((model, question) for _, model, question, _, _ in calls)
+    answers = {(qid, model) for qid, model in conn.execute("SELECT question_id, model FROM answers")}
+    errors = {(qid, model): attempts for qid, model, attempts in conn.execute("SELECT question_id, model, attempts FROM errors")}
+    statuses = Counter(status for (status,) in conn.execute("SELECT status FROM shards WHERE stage = ?", (INFER,)))
+    ghost_row = conn.execute("SELECT status, worker, attempts FROM shards WHERE id = ?", (ghost["id"],)).fetchone()
+    duke_calls = sorted((start, end) for provider, _, _, start, end in calls if provider == "duke")
+
+    def normal(qid):
+        return qid not in (3, 5)
+    checks = [
+        ("every infer shard is done", statuses == Counter({DONE: sum(statuses.values())})),
+        ("every answerable pair is answered",
+         answers == {(qid, m) for qid in range(SELFTEST_QUESTIONS) for m in models if qid != 3}),
+        ("the refused question is given up after MAX_ATTEMPTS calls",
+         all(errors.get((3, m)) == MAX_ATTEMPTS and per_pair[(m, questions[3]["question"])] == MAX_ATTEMPTS for m in models)),
+        ("the flaky question is answered on its retry",
+         all((5, m) not in errors and per_pair[(m, questions[5]["question"])] == 2 for m in models)),
+        ("retries re-ask only failed questions (every other pair called once)",
+         all(per_pair[(m, questions[qid]["question"])] == 1 for qid in range(SELFTEST_QUESTIONS) if normal(qid) for m in models)),
+        ("the expired lease is taken over by a live worker",
+         ghost_row[0] == DONE and ghost_row[1] != "ghost" and ghost_row[2] == 2),
+        ("duke never has two calls in flight (max_leases=1)",
+         all(prev_end <= start for (_, prev_end), (start, _) in zip(duke_calls, duke_calls[1:]))),
+    ]
+
+    # A changed input file must not be resumed
+    with open(INPUT_FILE, "w") as f:
+        json.dump(questions[:-1], f)
+    checks.append(("a queue built from another input file is refused", not init_queue(conn, questions[:-1])))
+
+    print()
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    passed = all(ok for _, ok in checks)
+    if passed:
+        shutil.rmtree(workdir)
+    else:
+        print(f"Queue and call log kept in {workdir}")
+    return passed
+
+# --- MAIN ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded inference + scoring across several workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    init_cmd = commands.add_parser("init", help="create the shard queue for the configured models")
+    worker_cmd = commands.add_parser("worker", help="claim and run shards until the queue is drained")
+    worker_cmd.add_argument("--stage", choices=[INFER, SCORE], help="only run one stage (default: both)")
+    commands.add_parser("status", help="show shard counts")
+    commands.add_parser("merge", help="write the results file and the consolidated scorecard")
+    local_cmd = commands.add_parser("local", help="init, run N worker processes on this machine, merge")
+    local_cmd.add_argument("workers", type=int)
+    for cmd in (init_cmd, local_cmd):
+        cmd.add_argument("--reset", action="store_true", help="rebuild a queue made for another input file or model list")
+    selftest_cmd = commands.add_parser("selftest", help="check leases, expiry and retries with fake providers")
+    selftest_cmd.add_argument("workers", type=int, nargs="?", default=3)
+    args = parser.parse_args()
+
+    if args.command == "selftest":
+        sys.exit(0 if run_selftest(args.workers) else 1)
+
+    if not os.path.exists(INPUT_FILE):
+        print(f"CRITICAL ERROR: {INPUT_FILE} not found.")
+        return
+
+    conn = connect()
+    questions = load_questions()
+
+    if args.command == "init":
+        if init_queue(conn, questions, reset=args.reset):
+            build_gt_indexes()
+        print_status(conn)
+    elif args.command == "worker":
+        run_worker((args.stage,) if args.stage else (INFER, SCORE))
+    elif args.command == "status":
+        print_status(conn)
+    elif args.command == "merge":
+        print_status(conn)
+        merge(conn, questions)
+    elif args.command == "local":
+        if not init_queue(conn, questions, reset=args.reset):
+            return
+        build_gt_indexes()
+        print(f"🚀 Starting {args.workers} local workers on {QUEUE_DB}")
+        procs = [subprocess.Popen([sys.executable, __file__, "worker"]) for _ in range(args.workers)]
+        for p in procs:
+            p.wait()
+        print_status(conn)
+        merge(conn, questions)
+
+if __name__ == "__main__":
+    main()
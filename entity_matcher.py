@@ -0,0 +1,71 @@
+import re
+
+# --- CONFIGURATION ---
+# Canonical 3-letter month names ("October", "Oct.", "oct" -> "oct")
+MONTHS = {
+    "jan": "jan", "january": "jan",
+    "feb": "feb", "february": "feb",
+    "mar": "mar", "march": "mar",
+    "apr": "apr", "april": "apr",
+    "may": "may",
+    "jun": "jun", "june": "jun",
+    "jul": "jul", "july": "jul",
+    "aug": "aug", "august": "aug",
+    "sep": "sep", "sept": "sep", "september": "sep",
+    "oct": "oct", "october": "oct",
+    "nov": "nov", "november": "nov",
+    "dec": "dec", "december": "dec",
+}
+
+# Spelled-out quantities that show up in deadlines ("ten days" == "10 days")
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14,
+    "fifteen": 15, "twenty": 20, "thirty": 30, "sixty": 60, "ninety": 90,
+}
+
+# --- 1. EXTRACTION (one compiled pattern, one pass over the lowercased text) ---
+# Case-folding the text once is about twice as fast as re.IGNORECASE on every character.
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_QTY = r"\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+
+ENTITY_PATTERN = re.compile(
+    rf"\b(?P<month>{_MONTH})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\b"        # Dates: Oct 1, October 1st
+    rf"|\$\s?(?P<dollars>\d{{1,3}}(?:,\d{{3}})+|\d+)(?:\.(?P<cents>\d{{2}}))?"  # Money: $2,500, $2500.00
+    rf"|\b(?P<fraction>\d+[/-]\d+)(?:th)?\b"                                   # Fractions: 1/60th
+    rf"|\b(?P<qty>{_QTY})[\s-](?P<unit>day|month|year)s?\b"                    # Durations: 30 days, ten-day
+)
+
+def normalize_match(m):
+    """Maps one match to its canonical form so equivalent spellings compare equal."""
+    if m.group("month"):
+        return f"{MONTHS[m.group('month').lower()]} {int(m.group('day'))}"
+    if m.group("dollars"):
+        amount = "$" + m.group("dollars").replace(",", "")
+        cents = m.group("cents")
+        return amount if not cents or cents == "00" else f"{amount}.{cents}"
+    if m.group("fraction"):
+        return m.group("fraction")
+    qty = m.group("qty").lower()
+    qty = NUMBER_WORDS.get(qty, qty)
+    return f"{int(qty)} {m.group('unit').lower()}s"
+
+def extract_entities(text):
+    """Every date, dollar amount, fraction and duration in `text`, normalized."""
+    if not text: return set()
+    return {normalize_match(m) for m in ENTITY_PATTERN.finditer(text.lower())}
+
+# --- 2. MATCHING ---
+# A response is run through the same grammar as the answer key, so every spelling the
+# extractor accepts ("Sept. 5", "$ 2,500", "October  1", "10\tdays") matches its canonical
+# form, and "$2,500" is never found inside "$2,500,000" (that extracts as "$2500000").
+def recall(gt_entities, response_entities):
+    """Share of the ground-truth entities that also appear among the response's entities."""
+    if not gt_entities:
+        return 1.0 # No entities to miss
+    return len(set(gt_entities) & set(response_entities)) / len(gt_entities)
+
+def entity_recall(gt_entities, model_text):
+    if not gt_entities:
+        return 1.0 # Skip the response pass entirely
+    return recall(gt_entities, extract_entities(model_text))
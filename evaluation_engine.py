@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from functools import cached_property
+
+import numpy as np
+
+import ai_leaderboard as core          # semantic similarity + entity extraction (loads the embedder)
+import entity_matcher                  # normalized entity recall
+import ai_leaderboard_extended as ext  # safety, grounding, reasoning
+import gt_index                        # precomputed ground-truth features per dataset
+
+# --- CONFIGURATION ---
+INPUT_FILE = core.INPUT_FILE
+OUTPUT_FILE = "results/consolidated_scorecard_mega.json"
+SCORE_CACHE_FILE = "results/score_cache.json" # Per-pair scores reused across runs
+
+# How a metric consumes the data:
+#   PER_TEXT -> fn(response_features)                    e.g. safety
+#   PER_PAIR -> fn(item_features, response_features)     e.g. grounding
+#   BATCHED  -> fn([(item_features, response_features)]) e.g. embeddings, scored in one call
+PER_TEXT = "per_text"
+PER_PAIR = "per_pair"
+BATCHED = "batched"
+
+# --- 1. METRIC REGISTRY ---
+METRICS = {}
+
+def register_metric(name, kind, version=1, scale=1.0):
+    """
+    Registers a scoring function with the engine.
+    Bump `version` whenever the metric's logic changes so stored scores are invalidated.
+    """
+    if kind not in (PER_TEXT, PER_PAIR, BATCHED):
+        raise ValueError(f"Unknown metric kind: {kind}")
+
+    def decorator(fn):
+        METRICS[name] = {"fn": fn, "kind": kind, "version": version, "scale": scale}
+        return fn
+    return decorator
+
+# --- 2. SHARED FEATURES ---
+class TextFeatures:
+    """Lazily computed views of one text, shared by every metric that needs them."""
+
+    def __init__(self, text):
+        self.text = text or ""
+        self.embedding = None # Filled in bulk by ensure_embeddings()
+
+    @cached_property
+    def lower(self):
+        return self.text.lower()
+
+    @cached_property
+    def words(self):
+        return self.lower.split()
+
+    @cached_property
+    def entities(self):
+        return core.extract_key_entities(self.text)
+
+    @cached_property
+    def citations(self):
+        return ext.extract_citations(self.text)
+
+def ensure_embeddings(features):
+    """Encodes every text that has no embedding yet, in a single embedder call."""
+    missing = {}
+    for f in features:
+        if f.embedding is None:
+            missing.setdefault(f.text, []).append(f)
+    if not missing:
+        return
+    texts = list(missing)
+    vectors = core.embedder.encode(texts, normalize_embeddings=True)
+    for text, vec in zip(texts, vectors):
+        for f in missing[text]:
+            f.embedding = vec
+
+def build_item_features(item, index=None):
+    """
+    Ground-truth side of one question. Built once and shared by every model.
+    Features found in the precomputed `index` are filled in instead of recomputed.
+    """
+    gt = TextFeatures(item['ground_truth'])
+    # Grounding compares against the answer key *and* its citation
+    ref = TextFeatures(item['ground_truth'] + " " + item.get('citation', ''))
+
+    stored = (index or {}).get(gt_index.item_key(item['question'], item['ground_truth'], item.get('citation', '')))
+    if stored:
+        gt.entities = set(stored["entities"])
+        gt.embedding = np.asarray(stored["embedding"])
+        ref.citations = set(stored["citations"])
+
+    return {"ground_truth": gt, "reference": ref}
+
+# --- 3. BUILT-IN METRICS ---
+@register_metric("semantic", BATCHED)
+def semantic_metric(pairs):
+    ensure_embeddings([f for item, resp in pairs for f in (item["ground_truth"], resp)])
+    # Embeddings are normalized, so the dot product is the cosine similarity
+    return [float(np.dot(item["ground_truth"].embedding, resp.embedding)) for item, resp in pairs]
+
+@register_metric("entity_recall", PER_PAIR, version=4)
+def entity_recall_metric(item, resp):
+    # Responses are only parsed when the answer key has entities to look for
+    return entity_matcher.recall(item["ground_truth"].entities, resp.entities if item["ground_truth"].entities else ())
+
+@register_metric("safety", PER_TEXT, scale=100.0)
+def safety_metric(resp):
+    return ext.score_safety_lower(resp.lower)
+
+@register_metric("grounding", PER_PAIR, scale=100.0)
+def grounding_metric(item, resp):
+    return ext.score_grounding_citations(item["reference"].citations, resp.citations)
+
+@register_metric("reasoning", PER_TEXT, scale=100.0)
+def reasoning_metric(resp):
+    return ext.score_reasoning_words(resp.words)
+
+# --- 4. PERSISTED PER-PAIR SCORES ---
+def pair_key(item, response):
+    """Content hash of everything a metric can look at for one (question, model) pair."""
+    payload = json.dumps([item['question'], item['ground_truth'], item.get('citation', ''), response])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def metric_key(name, spec):
+    return f"{name}@v{spec['version']}"
+
+def load_score_cache(path=SCORE_CACHE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_score_cache(cache, path=SCORE_CACHE_FILE):
+    with open(path, 'w') as f:
+        json.dump(cache, f)
+
+def store_score(cache, key, name, spec, score):
+    entry = cache.setdefault(key, {})
+    # Drop scores from older versions of the same metric
+    for stale in [k for k in entry if k.split("@v")[0] == name]:
+        del entry[stale]
+    entry[metric_key(name, spec)] = score
+
+# --- 5. SINGLE-PASS ENGINE ---
+def evaluate(data, metrics=None, cache=None, index=None):
+    """
+    Scores every (question, model) pair with every registered metric in one pass.
+    With a `cache`, only pairs/metrics without a stored score are computed; the cache is updated in place.
+    With a ground-truth `index` (see gt_index.py), only the response side is computed.
+    Returns a list of {"question_id", "model", <metric>: score, ...} rows.
+    """
+    metrics = metrics or METRICS
+    cache = {} if cache is None else cache
+    response_cache = {} # Identical answers share features (and embeddings)
+    rows = []
+    batched_inputs = defaultdict(list) # metric -> [(row, key, item_features, resp)]
+    computed = reused = 0
+
+    for q_index, item in enumerate(data):
+        item_features = build_item_features(item, index)
+        for model, response in item['responses'].items():
+            key = pair_key(item, response)
+            stored = cache.get(key, {})
+            if response not in response_cache:
+                response_cache[response] = TextFeatures(response)
+            resp = response_cache[response]
+
+            row = {"question_id": item.get('question_id', q_index), "model": model}
+            for name, spec in metrics.items():
+                mkey = metric_key(name, spec)
+                if mkey in stored:
+                    row[name] = stored[mkey]
+                    reused += 1
+                elif spec["kind"] == BATCHED:
+                    batched_inputs[name].append((row, key, item_features, resp))
+                else:
+                    if spec["kind"] == PER_TEXT:
+                        row[name] = float(spec["fn"](resp))
+                    else:
+                        row[name] = float(spec["fn"](item_features, resp))
+                    store_score(cache, key, name, spec, row[name])
+                    computed += 1
+            rows.append(row)
+
+    for name, pending in batched_inputs.items():
+        spec = metrics[name]
+        scores = spec["fn"]([(item_features, resp) for _, _, item_features, resp in pending])
+        for (row, key, _, _), score in zip(pending, scores):
+            row[name] = float(score)
+            store_score(cache, key, name, spec, row[name])
+            computed += 1
+
+    print(f"Computed {computed} scores, reused {reused} stored scores.")
+    return rows
+
+def aggregate(rows, metrics=None):
+    """Per-model mean of each metric."""
+    metrics = metrics or METRICS
+    per_model = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        for name in metrics:
+            if name in row:
+                per_model[row["model"]][name].append(row[name])
+    return {
+        model: {name: float(np.mean(values)) for name, values in scores.items()}
+        for model, scores in per_model.items()
+    }
+
+def print_scorecard(leaderboard, metrics=None):
+    metrics = metrics or METRICS
+    names = list(metrics)
+    # Columns fit the longest header / model name (values need at most 11 characters)
+    model_width = max([len("MODEL")] + [len(m) for m in leaderboard])
+    widths = [max(11, len(n)) for n in names]
+    width = model_width + 2 + sum(w + 3 for w in widths)
+    print("\n" + "=" * width)
+    print("CONSOLIDATED LEGAL BENCHMARK SCORECARD 🏆")
+    print("=" * width)
+    print(f"{'MODEL':<{model_width}} | " + " | ".join(f"{n.upper():<{w}}" for n, w in zip(names, widths)))
+    print("-" * width)
+    for model, scores in leaderboard.items():
+        cells = []
+        for n, w in zip(names, widths):
+            value = scores.get(n, float('nan'))
+            cells.append(f"{value:<{w}.2f}" if metrics[n]["scale"] > 1 else f"{value:<{w}.4f}")
+        print(f"{model:<{model_width}} | " + " | ".join(cells))
+    print("=" * width)
+
+def save_scorecard(rows, leaderboard, input_file=INPUT_FILE, path=OUTPUT_FILE):
+    scorecard = {
+        "input_file": input_file,
+        "metrics": {n: {"kind": s["kind"], "version": s["version"], "scale": s["scale"]} for n, s in METRICS.items()},
+        "leaderboard": leaderboard,
+        "scores": rows,
+    }
+    with open(path, 'w') as f:
+        json.dump(scorecard, f, indent=4)
+
+def main():
+    try:
+        with open(INPUT_FILE, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: {INPUT_FILE} not found. Run the inference engine first.")
+        return
+
+    print(f"Scoring {len(data)} questions with {len(METRICS)} metrics in a single pass...")
+    cache = load_score_cache()
+    index = gt_index.load_all_indexes()
+    rows = evaluate(data, cache=cache, index=index)
+    save_score_cache(cache)
+    leaderboard = aggregate(rows)
+    print_scorecard(leaderboard)
+    save_scorecard(rows, leaderboard)
+    print(f"\n✅ Scorecard saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
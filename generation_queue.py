@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import time
+from langchain_core.prompts import ChatPromptTemplate
+from tqdm import tqdm
+
+# --- CONFIGURATION ---
+MAX_ATTEMPTS = 4 # First try + repairs
+BACKOFF_BASE = 2 # Seconds; doubles after every failed attempt
+QUEUE_DIR = "results" # Kept out of data/, where every *.json is read as a dataset
+QUEUE_SUFFIX = ".queue.json" # data/foo.json -> results/foo.queue.json
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Appended to the caller's prompt after a failed attempt, so its rules still apply to the repair
+REPAIR_TURNS = ChatPromptTemplate.from_messages([
+    ("ai", "{previous}"),
+    ("user", "Your previous answer could not be used: {error}\n"
+             "Answer again following every rule above. Return ONLY valid JSON matching the schema.\n\n{format_instructions}")
+])
+
+# --- 1. THE WORK QUEUE ---
+def queue_path(output_file):
+    name = os.path.splitext(os.path.basename(output_file))[0]
+    path = os.path.join(QUEUE_DIR, name + QUEUE_SUFFIX)
+    legacy = os.path.splitext(output_file)[0] + QUEUE_SUFFIX # Where earlier runs kept it
+    if os.path.exists(legacy) and not os.path.exists(path):
+        os.replace(legacy, path)
+    return path
+
+def chunk_id(chunk):
+    payload = json.dumps([chunk.metadata.get("page", 0), chunk.page_content])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def load_queue(path, chunks):
+    """One entry per chunk. Chunks from earlier runs keep their status, new ones start pending."""
+    queue = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            queue = json.load(f)
+
+    for i, chunk in enumerate(chunks):
+        cid = chunk_id(chunk)
+        if cid not in queue:
+            queue[cid] = {"index": i, "page": chunk.metadata.get("page", 0) + 1, "status": PENDING,
+                          "attempts": 0, "tokens": 0, "pairs": [], "error": None}
+        queue[cid]["index"] = i
+    return queue
+
+def save_queue(path, queue):
+    with open(path, "w") as f:
+        json.dump(queue, f, indent=4)
+
+# --- 2. VALIDATED GENERATION ---
+def count_tokens(message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("total_tokens") or len(str(message.content)) // 4
+
+def validate(raw, parser, schema):
+    """Parses the raw model output and checks it against `schema`. Raises ValueError on anything unusable."""
+    try:
+        parsed = parser.parse(raw)
+    except Exception as e:
+        raise ValueError(f"output is not valid JSON ({e})")
+    try:
+        dataset = schema.model_validate(parsed)
+    except Exception as e:
+        raise ValueError(f"output does not match the schema ({e})")
+    if not dataset.pairs:
+        raise ValueError("output contains no question/answer pairs (refusal or empty chunk)")
+    return [pair.model_dump() for pair in dataset.pairs]
+
+def generate_chunk(chunk, entry, llm, prompt, parser, schema):
+    """Tries the chunk up to MAX_ATTEMPTS times, repairing from the last error. Updates `entry` in place."""
+    format_instructions = parser.get_format_instructions()
+    previous = None
+
+    while entry["attempts"] < MAX_ATTEMPTS:
+        messages = prompt.invoke({"text": chunk.page_content, "format_instructions": format_instructions}).to_messages()
+        if previous is not None:
+            messages += REPAIR_TURNS.invoke({
+                "previous": previous,
+                "error": entry["error"],
+                "format_instructions": format_instructions,
+            }).to_messages()
+
+        entry["attempts"] += 1
+        try:
+            message = llm.invoke(messages)
+            entry["tokens"] += count_tokens(message)
+            previous = str(message.content)
+            entry["pairs"] = validate(previous, parser, schema)
+            entry["status"] = DONE
+            entry["error"] = None
+            return
+        except Exception as e:
+            entry["error"] = str(e)[:500]
+            if entry["attempts"] < MAX_ATTEMPTS:
+                time.sleep(BACKOFF_BASE * 2 ** (entry["attempts"] - 1))
+
+    entry["status"] = FAILED
+
+# --- 3. PIPELINE ---
+def run_generation(chunks, llm, prompt, parser, schema, output_file):
+    """
+    Processes every pending or failed chunk, persisting the queue after each one,
+    then writes the dataset from all finished chunks and reports the yield.
+    """
+    path = queue_path(output_file)
+    queue = load_queue(path, chunks)
+    by_id = {chunk_id(c): c for c in chunks}
+    todo = [cid for cid in by_id if queue[cid]["status"] != DONE]
+    print(f"📋 {len(todo)} of {len(chunks)} chunks to process ({len(chunks) - len(todo)} already done).")
+
+    for cid in tqdm(todo):
+        entry = queue[cid]
+        entry["attempts"] = 0 # Failed chunks get a fresh set of attempts on a new run
+        generate_chunk(by_id[cid], entry, llm, prompt, parser, schema)
+        save_queue(path, queue)
+
+    dataset = []
+    for cid in sorted(by_id, key=lambda c: queue[c]["index"]):
+        entry = queue[cid]
+        if entry["status"] != DONE:
+            continue
+        for pair in entry["pairs"]:
+            # Add page metadata to the citation
+            dataset.append({**pair, "citation": f"{pair.get('citation', 'Unknown')} (Page {entry['page']})"})
+
+    with open(output_file, "w") as f:
+        json.dump(dataset, f, indent=4)
+
+    report_yield([queue[cid] for cid in by_id])
+    return dataset
+
+def report_yield(entries):
+    done = [e for e in entries if e["status"] == DONE]
+    failed = [e for e in entries if e["status"] == FAILED]
+    pairs = sum(len(e["pairs"]) for e in done)
+    tokens = sum(e["tokens"] for e in entries)
+
+    print("\n" + "=" * 40)
+    print("GENERATION YIELD 📈")
+    print("=" * 40)
+    print(f"Chunks done / failed / pending: {len(done)} / {len(failed)} / {len(entries) - len(done) - len(failed)}")
+    print(f"Pairs per finished chunk:       {pairs / len(done):.2f}" if done else "Pairs per finished chunk:       n/a")
+    print(f"Failure rate:                   {len(failed) / max(1, len(done) + len(failed)):.1%}")
+    print(f"Tokens per pair:                {tokens / pairs:.0f}" if pairs else "Tokens per pair:                n/a")
+    for e in failed:
+        print(f"  ✗ chunk {e['index']} (page {e['page']}): {e['error']}")
+    print("=" * 40)
@@ -0,0 +1,100 @@
+import glob
+import hashlib
+import json
+import os
+
+import ai_leaderboard as core          # extract_key_entities + embedder
+import ai_leaderboard_extended as ext  # extract_citations
+
+# --- CONFIGURATION ---
+DATA_DIR = "data"
+INDEX_SUFFIX = ".gtindex.json" # data/foo.json -> data/foo.gtindex.json
+INDEX_VERSION = 3 # Bump when the entity/citation extractors or the embedder change
+
+# --- HELPER FUNCTIONS ---
+
+def index_path(dataset_path):
+    return os.path.splitext(dataset_path)[0] + INDEX_SUFFIX
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def item_key(question, ground_truth, citation):
+    """Identifies one benchmark item in both dataset files and results files."""
+    payload = json.dumps([question, ground_truth, citation or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def is_dataset(path):
+    """True for benchmark datasets: a list of question items (skips indexes, queues and other JSON)."""
+    if path.endswith(INDEX_SUFFIX):
+        return False
+    try:
+        with open(path, "r") as f:
+            items = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(items, list) and all(
+        isinstance(item, dict) and "question" in item and "ground_truth_answer" in item for item in items
+    )
+
+def build_index(dataset_path):
+    """Precomputes the ground-truth side of every question in one dataset file."""
+    with open(dataset_path, "r") as f:
+        questions = json.load(f)
+
+    # Answer keys and questions are encoded in one embedder call
+    texts = [item["ground_truth_answer"] for item in questions] + [item["question"] for item in questions]
+    vectors = core.embedder.encode(texts, normalize_embeddings=True) if questions else []
+
+    items = {}
+    for i, item in enumerate(questions):
+        citation = item.get("citation", "")
+        items[item_key(item["question"], item["ground_truth_answer"], citation)] = {
+            "question": item["question"],
+            "ground_truth": item["ground_truth_answer"],
+            "citation": citation,
+            "entities": sorted(core.extract_key_entities(item["ground_truth_answer"])),
+            # Grounding compares against the answer key *and* its citation
+            "citations": sorted(ext.extract_citations(item["ground_truth_answer"] + " " + citation)),
+            "embedding": [float(x) for x in vectors[i]],
+            "question_embedding": [float(x) for x in vectors[len(questions) + i]], # For nearest-question search
+        }
+
+    return {
+        "version": INDEX_VERSION,
+        "dataset": dataset_path,
+        "dataset_hash": file_hash(dataset_path),
+        "items": items,
+    }
+
+def load_index(dataset_path):
+    """Returns the index for `dataset_path`, rebuilding it if the dataset content changed."""
+    path = index_path(dataset_path)
+    current_hash = file_hash(dataset_path)
+
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION and index.get("dataset_hash") == current_hash:
+            return index
+
+    print(f"🗂️  Building ground-truth index for {dataset_path}...")
+    index = build_index(dataset_path)
+    with open(path, "w") as f:
+        json.dump(index, f)
+    return index
+
+def load_all_indexes(data_dir=DATA_DIR):
+    """Merged {item_key: features} over every dataset in `data_dir`."""
+    merged = {}
+    for dataset_path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        if is_dataset(dataset_path):
+            merged.update(load_index(dataset_path)["items"])
+    return merged
+
+if __name__ == "__main__":
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.json"))):
+        if is_dataset(path):
+            index = load_index(path)
+            print(f"✅ {index_path(path)}: {len(index['items'])} questions")
@@ -0,0 +1,209 @@
+import json
+import os
+import time
+from openai import OpenAI
+from tqdm import tqdm
+
+import inference_engine_mega as eng
+
+# --- CONFIGURATION ---
+
+# 1. FILES
+INPUT_FILE = eng.INPUT_FILE
+OUTPUT_FILE = eng.OUTPUT_FILE
+BATCH_INPUT_FILE = "results/duke_batch_input.jsonl"
+BATCH_STATE_FILE = "results/duke_batch_state.json" # Lets an interrupted run resume polling
+
+# 2. BATCH SETTINGS
+# The Duke gateway is OpenAI-compatible, so we use the /v1/batches endpoint.
+# Batches are billed/queued separately from the ~20 RPM chat quota.
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+POLL_INTERVAL = 60 # seconds between status checks
+MAX_POLL_ERRORS = 8 # consecutive failed status checks before giving up (the batch keeps running)
+BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+
+# --- HELPER FUNCTIONS ---
+
+def pending_pairs(results, models):
+    """(question_id, model) pairs that still need an answer."""
+    return [(row["question_id"], m) for row in results for m in models if m not in row["responses"]]
+
+def custom_id(question_id, model_name):
+    return f"{question_id}::{model_name}"
+
+def write_batch_file(results, pairs):
+    """Writes one chat-completion request per pending pair (OpenAI batch JSONL format)."""
+    with open(BATCH_INPUT_FILE, "w") as f:
+        for question_id, model_name in pairs:
+            line = {
+                "custom_id": custom_id(question_id, model_name),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model_name,
+                    "messages": [
+                        {"role": "system", "content": eng.SYSTEM_PROMPT},
+                        {"role": "user", "content": results[question_id]["question"]}
+                    ],
+                    "temperature": 0,
+                }
+            }
+            f.write(json.dumps(line) + "\n")
+    return BATCH_INPUT_FILE
+
+def submit_batch(client, path):
+    """Uploads the JSONL and creates the batch. Raises if the gateway has no batch support."""
+    with open(path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+    )
+    with open(BATCH_STATE_FILE, "w") as f:
+        json.dump({"batch_id": batch.id, "input_file_id": batch_file.id}, f, indent=4)
+    return batch.id
+
+def poll_batch(client, batch_id):
+    """Blocks until the batch reaches a terminal state. Transient status-check errors back off and retry."""
+    errors = 0
+    while True:
+        try:
+            batch = client.batches.retrieve(batch_id)
+            errors = 0
+        except Exception as e:
+            errors += 1
+            if errors >= MAX_POLL_ERRORS:
+                raise
+            wait = min(POLL_INTERVAL * 2 ** (errors - 1), 30 * 60)
+            print(f"⚠️ Status check failed ({e}). Retrying in {wait}s...")
+            time.sleep(wait)
+            continue
+        counts = batch.request_counts
+        if counts:
+            print(f"⏳ Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+        else:
+            print(f"⏳ Batch {batch_id}: {batch.status}")
+        if batch.status in BATCH_DONE:
+            return batch
+        time.sleep(POLL_INTERVAL)
+
+def read_batch_output(client, batch):
+    """Maps custom_id -> answer text for every successful line of the batch output."""
+    answers = {}
+    if not batch.output_file_id:
+        return answers
+    content = client.files.content(batch.output_file_id).text
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        try:
+            answers[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            continue
+    return answers
+
+def run_duke_batch(results, pairs):
+    """
+    Sends all pending Duke pairs through the batch endpoint.
+    Returns {custom_id: answer}, or None if the gateway does not support batches.
+    Raises if an accepted batch can no longer be polled; it stays in BATCH_STATE_FILE for the next run.
+    """
+    client = OpenAI(api_key=eng.DUKE_API_KEY, base_url=eng.DUKE_BASE_URL)
+
+    batch_id = None
+    if os.path.exists(BATCH_STATE_FILE):
+        with open(BATCH_STATE_FILE, "r") as f:
+            batch_id = json.load(f).get("batch_id")
+        print(f"🔁 Resuming batch {batch_id}")
+    if batch_id is None:
+        # Only a rejected upload/create means the gateway has no batch support
+        try:
+            path = write_batch_file(results, pairs)
+            batch_id = submit_batch(client, path)
+        except Exception as e:
+            print(f"\n⚠️ Batch API unavailable on this gateway ({e}). Falling back to synchronous calls.")
+            return None
+        print(f"📦 Submitted {len(pairs)} prompts as batch {batch_id}")
+
+    batch = poll_batch(client, batch_id)
+
+    os.remove(BATCH_STATE_FILE)
+    if batch.status != "completed":
+        print(f"\n⚠️ Batch ended as '{batch.status}'. Unfinished prompts will run synchronously.")
+    return read_batch_output(client, batch)
+
+def run_sync(results, pairs, get_response, delay):
+    """The original one-call-per-pair path, used for fallbacks and non-Duke providers."""
+    for question_id, model_name in tqdm(pairs):
+        row = results[question_id]
+        row["responses"][model_name] = get_response(row["question"], model_name)
+        time.sleep(delay)
+
+def save(results):
+    with open(OUTPUT_FILE, "w") as f:
+        json.dump(results, f, indent=4)
+
+# --- MAIN ENGINE ---
+
+def main():
+    if not os.path.exists(INPUT_FILE):
+        print(f"CRITICAL ERROR: {INPUT_FILE} not found.")
+        return
+
+    with open(INPUT_FILE, "r") as f:
+        questions = json.load(f)
+
+    results = eng.load_existing_results(questions, OUTPUT_FILE)
+
+    duke_pairs = pending_pairs(results, eng.DUKE_MODELS)
+    gemini_pairs = pending_pairs(results, eng.GEMINI_MODELS)
+    local_pairs = pending_pairs(results, eng.LOCAL_MODELS)
+
+    print(f"🚀 Starting Batch Benchmark")
+    print(f"📊 Total Questions: {len(questions)}")
+    print(f"📨 Pending: {len(duke_pairs)} Duke (batched) + {len(gemini_pairs)} Gemini + {len(local_pairs)} Local\n")
+
+    # 1. DUKE (Batch API, synchronous fallback)
+    duke_pending = False
+    if duke_pairs:
+        try:
+            answers = run_duke_batch(results, duke_pairs)
+        except Exception as e:
+            # The batch is still queued on the gateway: running its prompts synchronously would pay twice
+            print(f"\n⚠️ Lost contact with the running batch ({e}). Re-run later to resume it from {BATCH_STATE_FILE}.")
+            answers, duke_pending = {}, True
+        if answers is None:
+            answers = {}
+        leftovers = []
+        for question_id, model_name in duke_pairs:
+            ans = answers.get(custom_id(question_id, model_name))
+            if ans:
+                results[question_id]["responses"][model_name] = ans
+            else:
+                leftovers.append((question_id, model_name))
+        save(results)
+        if leftovers and not duke_pending:
+            print(f"🐢 Running {len(leftovers)} Duke prompts synchronously...")
+            run_sync(results, leftovers, eng.get_duke_response, eng.DELAY_DUKE)
+            save(results)
+
+    # 2. GEMINI (no batch support through the native SDK here)
+    if gemini_pairs:
+        run_sync(results, gemini_pairs, eng.get_gemini_response, eng.DELAY_GEMINI)
+        save(results)
+
+    # 3. OLLAMA (local, no rate limit)
+    if local_pairs:
+        run_sync(results, local_pairs, eng.get_ollama_response, 0)
+        save(results)
+
+    print(f"\n✅ Batch Benchmark Complete! Saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
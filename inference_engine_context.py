@@ -0,0 +1,97 @@
+import json
+import os
+import time
+from tqdm import tqdm
+
+import inference_engine_mega as eng
+import prompt_builder as pb
+
+# --- CONFIGURATION ---
+
+# 1. FILES
+INPUT_FILE = eng.INPUT_FILE
+OUTPUT_FILE = "results/context_mega.json"
+
+# 2. PROMPT MODE
+ATTACH_CONTEXT = True # Include the source chunk(s) from nyc_tenants_rights.pdf (retrieval-augmented)
+# Asked after the first answer, in order. Empty list = single-turn.
+FOLLOW_UPS = [
+    "Which section of the source text supports that answer?",
+    "What is the first concrete step I should take?",
+]
+
+# --- HELPER FUNCTIONS ---
+
+def make_callers(usage):
+    """(model, call(messages), delay) for every configured model."""
+    callers = []
+    for m in eng.DUKE_MODELS:
+        stats = usage.setdefault(m, {})
+        callers.append((m, lambda msgs, m=m, stats=stats: eng.get_duke_chat(msgs, m, usage=stats), eng.DELAY_DUKE))
+    for m in eng.GEMINI_MODELS:
+        callers.append((m, lambda msgs, m=m: eng.get_gemini_chat(msgs, m), eng.DELAY_GEMINI))
+    for m in eng.LOCAL_MODELS:
+        callers.append((m, lambda msgs, m=m: eng.get_ollama_chat(msgs, m), 0))
+    return callers
+
+def run_conversation(call, question, source_chunks, delay):
+    """First answer plus one answer per follow-up. Each turn extends the previous prompt."""
+    history = []
+    turns = []
+    for turn_question in [question] + FOLLOW_UPS:
+        answer = call(pb.build_messages(turn_question, source_chunks, history))
+        turns.append({"question": turn_question, "answer": answer})
+        history += [{"role": "user", "content": turn_question}, {"role": "assistant", "content": answer}]
+        time.sleep(delay)
+        if answer.startswith("[ERROR]"):
+            break
+    return turns
+
+# --- MAIN ENGINE ---
+
+def main():
+    if not os.path.exists(INPUT_FILE):
+        print(f"CRITICAL ERROR: {INPUT_FILE} not found.")
+        return
+
+    with open(INPUT_FILE, "r") as f:
+        questions = json.load(f)
+
+    if ATTACH_CONTEXT:
+        chunks = pb.load_source_chunks()
+        planned = pb.order_for_cache(questions, chunks)
+        print(f"📄 Attached source chunks from {pb.SOURCE_PDF} ({len({pb.context_key(p[2]) for p in planned})} distinct contexts)")
+    else:
+        planned = [(i, item, []) for i, item in enumerate(questions)]
+
+    usage = {}
+    callers = make_callers(usage)
+    rows = {i: eng.build_row(i, item, {}) for i, item, _ in planned}
+    for i, _, source_chunks in planned:
+        rows[i]["context_pages"] = sorted({c["page"] for c in source_chunks})
+        rows[i]["followups"] = {}
+
+    print(f"🚀 Starting Context Benchmark")
+    print(f"📊 Total Questions: {len(questions)} x {1 + len(FOLLOW_UPS)} turns")
+
+    # Model-major order: one model walks all questions (sorted by context) before the next,
+    # so its provider-side prompt cache / Ollama KV cache stays warm.
+    for model, call, delay in callers:
+        print(f"\n🤖 {model}")
+        for i, item, source_chunks in tqdm(planned):
+            turns = run_conversation(call, item["question"], source_chunks, delay)
+            rows[i]["responses"][model] = turns[0]["answer"]
+            rows[i]["followups"][model] = turns[1:]
+
+        with open(OUTPUT_FILE, "w") as f:
+            json.dump([rows[i] for i in sorted(rows)], f, indent=4)
+
+    print("\nPrompt cache (Duke, as reported by the gateway):")
+    for model, stats in usage.items():
+        if stats.get("prompt_tokens"):
+            print(f"  {model:<17} {stats['cached_tokens'] / stats['prompt_tokens']:.0%} of {stats['prompt_tokens']} prompt tokens served from cache")
+
+    print(f"\n✅ Context Benchmark Complete! Saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
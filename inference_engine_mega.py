@@ -44,62 +44,84 @@ LOCAL_MODELS = ["llama3"]
 DELAY_DUKE = 4
 DELAY_GEMINI = 15 
 
+SYSTEM_PROMPT = "You are a helpful housing law assistant. Answer accurately based on NYC law."
+GEMINI_PROMPT = "You are a housing law assistant. Answer accurately based on NYC law: {question}"
+
+# Safety settings to prevent 'None' responses on legal topics
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_ONLY_HIGH"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
+]
+
 # --- HELPER FUNCTIONS ---
 
-def get_duke_response(question, model_name):
-    """Hits Duke's LiteLLM Gateway."""
+def get_duke_response(question, model_name, on_rate_limit=None):
+    """
+    Hits Duke's LiteLLM Gateway.
+    `on_rate_limit(seconds)` is called on every 429 with the back-off about to be slept (used by scheduler.py).
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": question}
+    ]
+    return get_duke_chat(messages, model_name, on_rate_limit=on_rate_limit)
+
+def get_duke_chat(messages, model_name, on_rate_limit=None, usage=None):
+    """
+    Sends a full message list to Duke's gateway (multi-turn / long-context prompts).
+    If `usage` is a dict, prompt and cached-prompt token counts are added to it.
+    """
     client = OpenAI(api_key=DUKE_API_KEY, base_url=DUKE_BASE_URL)
     
     for attempt in range(3):
         try:
             response = client.chat.completions.create(
                 model=model_name,
-                messages=[
-                    {"role": "system", "content": "You are a helpful housing law assistant. Answer accurately based on NYC law."},
-                    {"role": "user", "content": question}
-                ],
+                messages=messages,
                 temperature=0, 
             )
+            if usage is not None and response.usage:
+                details = getattr(response.usage, "prompt_tokens_details", None)
+                usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + response.usage.prompt_tokens
+                usage["cached_tokens"] = usage.get("cached_tokens", 0) + ((details and details.cached_tokens) or 0)
             return response.choices[0].message.content
         except Exception as e:
             if "429" in str(e) or "Rate limit" in str(e):
+                if on_rate_limit: on_rate_limit(60)
                 print(f"\n⚠️ Duke Rate Limit ({model_name}). Sleeping 60s...")
                 time.sleep(60)
             else:
                 return f"[ERROR] Duke Failed: {e}"
     return "[ERROR] Failed after 3 retries"
 
-def get_gemini_response(question, model_name):
-    """Hits Google's Generative AI API (Native SDK)."""
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel(model_name)
-        
-        # Safety settings to prevent 'None' responses on legal topics
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_ONLY_HIGH"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
-        ]
-
-        response = model.generate_content(
-            f"You are a housing law assistant. Answer accurately based on NYC law: {question}",
-            generation_config=genai.types.GenerationConfig(temperature=0.0),
-            safety_settings=safety_settings
-        )
-        
-        if response.text:
-            return response.text
-        else:
-            return "[ERROR] Gemini Safety Filter Triggered"
-            
-    except Exception as e:
-        if "429" in str(e) or "ResourceExhausted" in str(e):
-            print(f"\n⚠️ Gemini 5 RPM Limit Hit! Sleeping 30s...")
-            time.sleep(30)
-            return get_gemini_response(question, model_name) # One retry
-        return f"[ERROR] Gemini Failed: {e}"
+def get_gemini_response(question, model_name, on_rate_limit=None):
+    """Hits Google's Generative AI API (Native SDK). `on_rate_limit(seconds)` is called on every 429."""
+    genai.configure(api_key=GEMINI_API_KEY)
+    model = genai.GenerativeModel(model_name)
+
+    for attempt in range(3):
+        try:
+            response = model.generate_content(
+                GEMINI_PROMPT.format(question=question),
+                generation_config=genai.types.GenerationConfig(temperature=0.0),
+                safety_settings=GEMINI_SAFETY_SETTINGS
+            )
+
+            if response.text:
+                return response.text
+            else:
+                return "[ERROR] Gemini Safety Filter Triggered"
+
+        except Exception as e:
+            if "429" in str(e) or "ResourceExhausted" in str(e):
+                if on_rate_limit: on_rate_limit(30)
+                print(f"\n⚠️ Gemini 5 RPM Limit Hit! Sleeping 30s...")
+                time.sleep(30)
+            else:
+                return f"[ERROR] Gemini Failed: {e}"
+    return "[ERROR] Failed after 3 retries"
 
 def get_ollama_response(question, model_name):
     """Hits Local Ollama."""
@@ -119,6 +141,83 @@ def get_ollama_response(question, model_name):
     except Exception as e:
         return f"[ERROR] Ollama Connect Failed: {e}"
 
+def get_gemini_chat(messages, model_name):
+    """Multi-turn Gemini call: the system message becomes the system instruction."""
+    genai.configure(api_key=GEMINI_API_KEY)
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    model = genai.GenerativeModel(model_name, system_instruction=system or None)
+    contents = [
+        {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+        for m in messages if m["role"] != "system"
+    ]
+
+    for attempt in range(3):
+        try:
+            response = model.generate_content(
+                contents,
+                generation_config=genai.types.GenerationConfig(temperature=0.0),
+                safety_settings=GEMINI_SAFETY_SETTINGS
+            )
+            if response.text:
+                return response.text
+            return "[ERROR] Gemini Safety Filter Triggered"
+
+        except Exception as e:
+            if "429" in str(e) or "ResourceExhausted" in str(e):
+                print(f"\n⚠️ Gemini 5 RPM Limit Hit! Sleeping 30s...")
+                time.sleep(30)
+            else:
+                return f"[ERROR] Gemini Failed: {e}"
+    return "[ERROR] Failed after 3 retries"
+
+def get_ollama_chat(messages, model_name, keep_alive="30m"):
+    """Multi-turn Ollama call. `keep_alive` keeps the model and its prompt KV cache loaded."""
+    try:
+        response = requests.post(
+            OLLAMA_URL,
+            json={
+                "model": model_name,
+                "messages": messages,
+                "stream": False,
+                "keep_alive": keep_alive,
+                "options": {"temperature": 0}
+            }
+        )
+        if response.status_code == 200:
+            return response.json()['message']['content']
+        return f"[ERROR] Status {response.status_code}"
+    except Exception as e:
+        return f"[ERROR] Ollama Connect Failed: {e}"
+
+def build_row(i, item, responses):
+    """One entry of the standard results file."""
+    return {
+        "question_id": i,
+        "category": item.get("category", "General"),
+        "question": item["question"],
+        "ground_truth": item["ground_truth_answer"],
+        "citation": item.get("citation", "N/A"),
+        "responses": responses
+    }
+
+def is_answered(text):
+    return bool(text) and not text.startswith("[ERROR]")
+
+def load_existing_results(questions, output_file=OUTPUT_FILE):
+    """Reuse answers from a previous run so only pending prompts are sent."""
+    if not os.path.exists(output_file):
+        return [build_row(i, item, {}) for i, item in enumerate(questions)]
+
+    with open(output_file, "r") as f:
+        previous = {row["question"]: row for row in json.load(f)}
+
+    results = []
+    for i, item in enumerate(questions):
+        old = previous.get(item["question"], {})
+        responses = {m: a for m, a in old.get("responses", {}).items() if is_answered(a)}
+        results.append(build_row(i, item, responses))
+    return results
+
 # --- MAIN ENGINE ---
 
 def main():
@@ -164,14 +263,7 @@ def main():
             current_responses[model] = ans
 
         # Save Row
-        results.append({
-            "question_id": i,
-            "category": item.get("category", "General"),
-            "question": q_text,
-            "ground_truth": item["ground_truth_answer"],
-            "citation": item.get("citation", "N/A"),
-            "responses": current_responses
-        })
+        results.append(build_row(i, item, current_responses))
 
         # Periodic Save
         if i % 2 == 0: # Save often because this script is slow
@@ -0,0 +1,180 @@
+import json
+import os
+import requests
+import time
+from openai import OpenAI
+import google.generativeai as genai
+from tqdm import tqdm
+
+import inference_engine_mega as eng
+
+# --- CONFIGURATION ---
+
+# 1. FILES
+INPUT_FILE = eng.INPUT_FILE
+OUTPUT_FILE = "results/samples_mega.json"
+
+# 2. SAMPLING
+# N samples per (question, model) at a non-zero temperature. Providers that support it
+# return all N in ONE request (OpenAI `n`, Gemini `candidate_count`), so the prompt is
+# sent and billed once and the RPM cost is the same as a normal run.
+N_SAMPLES = 5
+SAMPLE_TEMPERATURE = 0.7
+GEMINI_MAX_CANDIDATES = 8 # Gemini API limit per request
+OLLAMA_KEEP_ALIVE = "30m" # Keep the model (and its prompt KV cache) loaded between samples
+
+# Duke models whose gateway route rejected `n` this run (filled in by get_duke_samples)
+SINGLE_COMPLETION_MODELS = set()
+
+# --- HELPER FUNCTIONS ---
+
+def get_duke_samples(question, model_name, n=N_SAMPLES, temperature=SAMPLE_TEMPERATURE):
+    """
+    N completions from one Duke request (`n`), topped up if the model returns fewer.
+    Models whose route rejects `n` fall back to N single-completion requests.
+    """
+    client = OpenAI(api_key=eng.DUKE_API_KEY, base_url=eng.DUKE_BASE_URL)
+    samples = []
+    rate_limited = 0
+
+    while len(samples) < n:
+        use_n = model_name not in SINGLE_COMPLETION_MODELS
+        try:
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": eng.SYSTEM_PROMPT},
+                    {"role": "user", "content": question}
+                ],
+                temperature=temperature,
+                **({"n": n - len(samples)} if use_n else {}),
+            )
+            if not response.choices: # Nothing to top up from; retrying would loop forever
+                return samples + ["[ERROR] Duke returned no choices"] * (n - len(samples))
+            samples.extend(c.message.content or "[ERROR] Duke returned no content" for c in response.choices)
+        except Exception as e:
+            if ("429" in str(e) or "Rate limit" in str(e)) and rate_limited < 3:
+                rate_limited += 1
+                print(f"\n⚠️ Duke Rate Limit ({model_name}). Sleeping 60s...")
+                time.sleep(60)
+                continue
+            if use_n and ("400" in str(e) or "BadRequest" in type(e).__name__):
+                print(f"\n⚠️ {model_name} rejected `n`. Falling back to one request per sample.")
+                SINGLE_COMPLETION_MODELS.add(model_name)
+                continue
+            return samples + [f"[ERROR] Duke Failed: {e}"] * (n - len(samples))
+        if len(samples) < n: # Some gateway models ignore `n`, and the fallback returns one at a time
+            time.sleep(eng.DELAY_DUKE)
+    return samples[:n]
+
+def get_gemini_samples(question, model_name, n=N_SAMPLES, temperature=SAMPLE_TEMPERATURE):
+    """N candidates per Gemini request (`candidate_count`)."""
+    genai.configure(api_key=eng.GEMINI_API_KEY)
+    model = genai.GenerativeModel(model_name)
+    samples = []
+    rate_limited = 0
+
+    while len(samples) < n:
+        count = min(GEMINI_MAX_CANDIDATES, n - len(samples))
+        try:
+            response = model.generate_content(
+                eng.GEMINI_PROMPT.format(question=question),
+                generation_config=genai.types.GenerationConfig(temperature=temperature, candidate_count=count),
+                safety_settings=eng.GEMINI_SAFETY_SETTINGS
+            )
+            for candidate in response.candidates:
+                text = "".join(part.text for part in candidate.content.parts if hasattr(part, "text"))
+                samples.append(text or "[ERROR] Gemini Safety Filter Triggered")
+            if not response.candidates:
+                samples.append("[ERROR] Gemini Safety Filter Triggered")
+        except Exception as e:
+            if ("429" in str(e) or "ResourceExhausted" in str(e)) and rate_limited < 3:
+                rate_limited += 1
+                print(f"\n⚠️ Gemini 5 RPM Limit Hit! Sleeping 30s...")
+                time.sleep(30)
+                continue
+            samples.extend([f"[ERROR] Gemini Failed: {e}"] * count)
+        if len(samples) < n:
+            time.sleep(eng.DELAY_GEMINI)
+    return samples[:n]
+
+def get_ollama_samples(question, model_name, n=N_SAMPLES, temperature=SAMPLE_TEMPERATURE):
+    """
+    Ollama has no `n`, so we send N requests back to back with different seeds.
+    The prompt is identical, so Ollama reuses its cached prompt KV state and only decodes.
+    """
+    samples = []
+    for seed in range(n):
+        try:
+            response = requests.post(
+                eng.OLLAMA_URL,
+                json={
+                    "model": model_name,
+                    "messages": [{"role": "user", "content": question}],
+                    "stream": False,
+                    "keep_alive": OLLAMA_KEEP_ALIVE,
+                    "options": {"temperature": temperature, "seed": seed}
+                }
+            )
+            if response.status_code == 200:
+                samples.append(response.json()['message']['content'])
+            else:
+                samples.append(f"[ERROR] Status {response.status_code}")
+        except Exception as e:
+            samples.append(f"[ERROR] Ollama Connect Failed: {e}")
+    return samples
+
+# --- MAIN ENGINE ---
+
+def main():
+    if not os.path.exists(INPUT_FILE):
+        print(f"CRITICAL ERROR: {INPUT_FILE} not found.")
+        return
+
+    with open(INPUT_FILE, "r") as f:
+        questions = json.load(f)
+
+    # Resume: keep every (question, model) that already has N error-free samples
+    done = {}
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, "r") as f:
+            done = {row["question"]: row for row in json.load(f)}
+
+    print(f"🎲 Starting Multi-Sample Benchmark")
+    print(f"📊 Total Questions: {len(questions)} x {N_SAMPLES} samples @ temperature {SAMPLE_TEMPERATURE}")
+    print(f"🤖 Models: {len(eng.DUKE_MODELS)} Duke + {len(eng.GEMINI_MODELS)} Gemini + {len(eng.LOCAL_MODELS)} Local\n")
+
+    plan = (
+        [(m, get_duke_samples, eng.DELAY_DUKE) for m in eng.DUKE_MODELS]
+        + [(m, get_gemini_samples, eng.DELAY_GEMINI) for m in eng.GEMINI_MODELS]
+        + [(m, get_ollama_samples, 0) for m in eng.LOCAL_MODELS]
+    )
+
+    results = []
+    for i, item in tqdm(enumerate(questions), total=len(questions)):
+        samples = dict(done.get(item["question"], {}).get("samples", {}))
+
+        for model, get_samples, delay in plan:
+            previous = samples.get(model, [])
+            if len(previous) >= N_SAMPLES and all(eng.is_answered(s) for s in previous):
+                continue
+            samples[model] = get_samples(item["question"], model)
+            time.sleep(delay)
+
+        # `responses` keeps the first sample so the standard scorers still work on this file
+        row = eng.build_row(i, item, {m: s[0] for m, s in samples.items() if s})
+        row["samples"] = samples
+        row["temperature"] = SAMPLE_TEMPERATURE
+        results.append(row)
+
+        if i % 2 == 0:
+            with open(OUTPUT_FILE, "w") as f:
+                json.dump(results, f, indent=4)
+
+    with open(OUTPUT_FILE, "w") as f:
+        json.dump(results, f, indent=4)
+
+    print(f"\n✅ Sampling Complete! Saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,19 @@
 import os
 import requests
-import json
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
-from tqdm import tqdm
+
+import generation_queue
 
 # --- CONFIGURATION ---
 PDF_URL = "resource/tenants_rights.pdf"
 LOCAL_PDF_FILENAME = "resource/nyc_tenants_rights.pdf"
 OUTPUT_FILE = "data/nyc_benchmark_data.json"
+CHUNK_LIMIT = 15
 
 # --- 1. DOWNLOADER ---
 def download_pdf(url, filename):
@@ -56,8 +57,6 @@ prompt = ChatPromptTemplate.from_messages([
     ("user", "Text Chunk: {text}\n\n{format_instructions}")
 ])
 
-chain = prompt | local_llm | parser
-
 def main():
     # 1. Get Data
     download_pdf(PDF_URL, LOCAL_PDF_FILENAME)
@@ -71,33 +70,14 @@ def main():
     splits = splitter.split_documents(docs)
     print(f"Document split into {len(splits)} chunks.")
 
-    dataset = []
-    
-    # 3. Generate (with Progress Bar)
-    # We process the first 15 chunks for the Hackathon Demo (to save time).
-    # Remove [:15] to process the whole book (might take ~20 mins on a laptop).
+    # 3. Generate (queued, validated, retried)
+    # We process the first CHUNK_LIMIT chunks for the Hackathon Demo (to save time).
+    # Set CHUNK_LIMIT = None to process the whole book (might take ~20 mins on a laptop).
+    # Progress is kept in a queue file in results/, so a rerun only retries failed/pending chunks.
     print("Generating Benchmark Questions...")
-    for i, chunk in tqdm(enumerate(splits[:15]), total=15):
-        try:
-            response = chain.invoke({
-                "text": chunk.page_content,
-                "format_instructions": parser.get_format_instructions()
-            })
-            
-            if response and "pairs" in response:
-                # Add page metadata to the citation if missing
-                page_num = chunk.metadata.get("page", 0) + 1
-                for pair in response["pairs"]:
-                    pair["citation"] = f"{pair.get('citation', 'Unknown')} (Page {page_num})"
-                    dataset.append(pair)
-                    
-        except Exception as e:
-            # Llama sometimes fails on empty chunks, just skip
-            continue
-
-    # 4. Save
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(dataset, f, indent=4)
+    dataset = generation_queue.run_generation(
+        splits[:CHUNK_LIMIT], local_llm, prompt, parser, QADataset, OUTPUT_FILE
+    )
         
     print(f"\nSUCCESS! Generated {len(dataset)} NYC Benchmark Questions.")
     print(f"Saved to: {OUTPUT_FILE}")
@@ -1,13 +1,13 @@
 import os
 import requests
-import json
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
-from tqdm import tqdm
+
+import generation_queue
 
 # --- CONFIGURATION ---
 # 1. API SETUP (Duke AI Gateway)
@@ -19,6 +19,7 @@ MODEL_NAME = "gpt-5.2"
 PDF_URL = "resource/nyc_tenants_rights.pdf"
 LOCAL_PDF_FILENAME = "resource/nyc_tenants_rights.pdf"
 OUTPUT_FILE = "nyc_benchmark_data_duke.json"
+CHUNK_LIMIT = 15
 
 # --- 1. DOWNLOADER ---
 def download_pdf(url, filename):
@@ -72,8 +73,6 @@ prompt = ChatPromptTemplate.from_messages([
     ("user", "Text Chunk: {text}\n\n{format_instructions}")
 ])
 
-chain = prompt | llm | parser
-
 def main():
     # 1. Get Data
     download_pdf(PDF_URL, LOCAL_PDF_FILENAME)
@@ -90,32 +89,12 @@ def main():
     splits = splitter.split_documents(docs)
     print(f"Document split into {len(splits)} chunks.")
 
-    dataset = []
-    
-    # 3. Generate (with Progress Bar)
-    # Process the first 15 chunks for the demo
+    # 3. Generate (queued, validated, retried)
+    # Process the first CHUNK_LIMIT chunks for the demo
     print("Generating Benchmark Questions via Duke AI...")
-    for i, chunk in tqdm(enumerate(splits[:15]), total=15):
-        try:
-            response = chain.invoke({
-                "text": chunk.page_content,
-                "format_instructions": parser.get_format_instructions()
-            })
-            
-            if response and "pairs" in response:
-                page_num = chunk.metadata.get("page", 0) + 1
-                for pair in response["pairs"]:
-                    pair["citation"] = f"{pair.get('citation', 'Unknown')} (Page {page_num})"
-                    dataset.append(pair)
-                    
-        except Exception as e:
-            # If the model refuses or fails, skip
-            # print(f"Skipping chunk {i}: {e}") 
-            continue
-
-    # 4. Save
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(dataset, f, indent=4)
+    dataset = generation_queue.run_generation(
+        splits[:CHUNK_LIMIT], llm, prompt, parser, QADataset, OUTPUT_FILE
+    )
         
     print(f"\nSUCCESS! Generated {len(dataset)} NYC Benchmark Questions.")
     print(f"Saved to: {OUTPUT_FILE}")
@@ -0,0 +1,133 @@
+import json
+from collections import defaultdict
+
+import numpy as np
+
+import evaluation_engine as ee
+import gt_index
+import inference_engine_mega as eng
+
+# --- CONFIGURATION ---
+INPUT_FILE = "results/samples_mega.json" # Written by inference_engine_sampling.py
+OUTPUT_FILE = "results/sample_stats_mega.json"
+N_BOOTSTRAP = 2000
+CONFIDENCE = 0.95
+SEED = 0
+
+# --- 1. SCORE EVERY SAMPLE ---
+def score_samples(data, cache=None, index=None):
+    """
+    Scores sample k of every (question, model) pair through the evaluation engine.
+    Rows come back tagged with "sample": k. Files without `samples` count as one sample each.
+    Error samples are skipped, so a failed call never scores as an answer.
+    """
+    rows = []
+    n_samples = max((len(s) for item in data for s in item.get('samples', {}).values()), default=1)
+    for k in range(n_samples):
+        view = []
+        for item in data:
+            samples = item.get('samples') or {m: [r] for m, r in item['responses'].items()}
+            responses = {m: s[k] for m, s in samples.items() if k < len(s) and eng.is_answered(s[k])}
+            view.append({**item, 'responses': responses})
+        for row in ee.evaluate(view, cache=cache, index=index):
+            row["sample"] = k
+            rows.append(row)
+    return rows
+
+# --- 2. STATISTICS ---
+def per_question_scores(rows, metric):
+    """{model: {question_id: [score per sample]}}"""
+    scores = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        scores[row["model"]][row["question_id"]].append(row[metric])
+    return scores
+
+def bootstrap_ci(values, rng, n_boot=N_BOOTSTRAP, confidence=CONFIDENCE):
+    """Percentile CI of the mean, resampling questions with replacement. None for no values."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return None
+    idx = rng.integers(0, len(values), size=(n_boot, len(values)))
+    means = values[idx].mean(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    return float(np.percentile(means, tail)), float(np.percentile(means, 100 - tail))
+
+def summarize(rows, metrics=None, seed=SEED):
+    """
+    Per model and metric: mean, within-pair std (answer stability across samples),
+    bootstrap CI over questions, and a paired bootstrap CI of the gap to the leader.
+    """
+    if not rows:
+        return {} # Nothing scored (e.g. every sample was an error)
+    metrics = metrics or ee.METRICS
+    rng = np.random.default_rng(seed)
+    summary = defaultdict(dict)
+
+    for metric in metrics:
+        scores = per_question_scores(rows, metric)
+        # Mean over samples per question: the unit we resample is the question
+        question_means = {m: {q: float(np.mean(v)) for q, v in qs.items()} for m, qs in scores.items()}
+        leader = max(question_means, key=lambda m: np.mean(list(question_means[m].values())))
+
+        for model, qs in scores.items():
+            means = np.array(list(question_means[model].values()))
+            within = [np.std(v, ddof=1) for v in qs.values() if len(v) > 1]
+            low, high = bootstrap_ci(means, rng) # Every model in `scores` has at least one question
+            stats = {
+                "mean": float(means.mean()),
+                "ci": [low, high],
+                "within_pair_std": float(np.mean(within)) if within else 0.0,
+                "samples_per_pair": float(np.mean([len(v) for v in qs.values()])),
+            }
+            if model != leader:
+                shared = sorted(set(question_means[leader]) & set(question_means[model]))
+                gaps = [question_means[leader][q] - question_means[model][q] for q in shared]
+                gap_ci = bootstrap_ci(gaps, rng)
+                stats["gap_to_leader"] = {
+                    "leader": leader,
+                    "shared_questions": len(shared),
+                    "ci": list(gap_ci) if gap_ci else None, # No questions answered by both models
+                    "significant": bool(gap_ci and gap_ci[0] > 0),
+                }
+            summary[model][metric] = stats
+    return dict(summary)
+
+def print_summary(summary, metrics=None):
+    metrics = metrics or ee.METRICS
+    for metric in metrics:
+        print(f"\n{metric.upper()}")
+        print(f"{'MODEL':<17} | {'MEAN':<8} | {'95% CI':<19} | {'STABILITY (SD)':<14} | GAP TO LEADER")
+        print("-" * 86)
+        ranked = sorted(summary, key=lambda m: summary[m][metric]["mean"], reverse=True)
+        for model in ranked:
+            s = summary[model][metric]
+            gap = s.get("gap_to_leader")
+            if gap is None:
+                verdict = "leader"
+            elif gap["ci"] is None:
+                verdict = "no shared questions"
+            else:
+                verdict = "real" if gap["significant"] else "within noise"
+            print(f"{model:<17} | {s['mean']:<8.3f} | [{s['ci'][0]:7.3f}, {s['ci'][1]:7.3f}] | {s['within_pair_std']:<14.3f} | {verdict}")
+
+def main():
+    try:
+        with open(INPUT_FILE, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: {INPUT_FILE} not found. Run inference_engine_sampling.py first.")
+        return
+
+    cache = ee.load_score_cache()
+    rows = score_samples(data, cache=cache, index=gt_index.load_all_indexes())
+    ee.save_score_cache(cache)
+
+    summary = summarize(rows)
+    print_summary(summary)
+
+    with open(OUTPUT_FILE, 'w') as f:
+        json.dump(summary, f, indent=4)
+    print(f"\n✅ Sample statistics saved to {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import date
+from tqdm import tqdm
+
+import inference_engine_mega as eng
+
+# --- CONFIGURATION ---
+
+# 1. FILES
+INPUT_FILE = eng.INPUT_FILE
+OUTPUT_FILE = eng.OUTPUT_FILE
+QUOTA_FILE = "results/provider_quota.json" # Requests sent per provider today, shared across runs
+
+# 2. PROVIDER QUOTAS & PRICES
+# rpm / tpm / daily: None = unlimited. Prices are USD per 1M tokens.
+# concurrency: requests in flight at once (the RPM quota, not latency, should be the bottleneck).
+PROVIDERS = {
+    "duke": {
+        "models": eng.DUKE_MODELS,
+        "call": eng.get_duke_response,
+        "reports_429": True,
+        "rpm": 20, "tpm": None, "daily": None,
+        "price_in": 0.0, "price_out": 0.0, # Covered by the university gateway
+        "concurrency": 4,
+    },
+    "gemini": {
+        "models": eng.GEMINI_MODELS,
+        "call": eng.get_gemini_response,
+        "reports_429": True,
+        "rpm": 5, "tpm": 250_000, "daily": 250,
+        "price_in": 0.30, "price_out": 2.50,
+        "concurrency": 2,
+    },
+    "ollama": {
+        "models": eng.LOCAL_MODELS,
+        "call": eng.get_ollama_response,
+        "reports_429": False,
+        "rpm": None, "tpm": None, "daily": None,
+        "price_in": 0.0, "price_out": 0.0,
+        "concurrency": 1, # One local GPU
+    },
+}
+
+# 3. SCHEDULER SETTINGS
+COST_CEILING = 5.00 # USD for the whole run
+RPM_HEADROOM = 0.9 # Plan at 90% of the advertised RPM
+BACKOFF_FACTOR = 0.5 # Effective RPM multiplier after a 429
+SLOWDOWN_FACTOR = 2.0 # A call this many times slower than average counts as a slowdown
+RECOVERY_STEP = 0.05 # Share of the max RPM regained per successful call
+CHARS_PER_TOKEN = 4
+EST_OUTPUT_TOKENS = 700 # Initial guess; replaced by the observed average
+SAVE_EVERY = 10 # completed calls between periodic saves
+
+# --- HELPER FUNCTIONS ---
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def pair_cost(cfg, in_tokens, out_tokens):
+    return (in_tokens * cfg["price_in"] + out_tokens * cfg["price_out"]) / 1_000_000
+
+def load_quota_usage(quota_file=QUOTA_FILE):
+    """{provider: requests sent today} from earlier runs. Other days are dropped."""
+    if not os.path.exists(quota_file):
+        return {}
+    with open(quota_file, "r") as f:
+        return json.load(f).get(date.today().isoformat(), {})
+
+def save_quota_usage(states, quota_file=QUOTA_FILE):
+    usage = {}
+    for state in states.values():
+        with state.lock:
+            day, count = state.day, state.sent_today
+        usage.setdefault(day, {})[state.name] = count
+    latest = max(usage)
+    with open(quota_file, "w") as f:
+        json.dump({latest: usage[latest]}, f, indent=4)
+
+class ProviderState:
+    """Live quota, rate and throughput bookkeeping for one provider."""
+
+    def __init__(self, name, cfg, sent_today=0):
+        self.name = name
+        self.cfg = cfg
+        self.max_rpm = cfg["rpm"] * RPM_HEADROOM if cfg["rpm"] else None
+        self.rpm = self.max_rpm # Re-planned live on 429s and slowdowns
+        self.queue = deque() # (question_id, model) in dispatch order
+        self.lock = threading.Lock()
+        self.next_slot = 0.0 # Earliest start time of the next request
+        self.token_window = deque() # (timestamp, tokens) over the last 60s
+        self.day = date.today().isoformat()
+        self.sent_today = sent_today # Includes earlier runs today; checked against the daily quota
+        self.sent = 0
+        self.done = 0
+        self.rate_limited = 0
+        self.avg_latency = None
+        self.exhausted = False
+
+    def acquire(self, tokens):
+        """Blocks until a request fits every quota. Returns False once the daily quota is spent."""
+        while True:
+            with self.lock:
+                now = time.time()
+                today = date.today().isoformat()
+                if today != self.day: # Quota reset at midnight
+                    self.day, self.sent_today, self.exhausted = today, 0, False
+                if self.cfg["daily"] and self.sent_today >= self.cfg["daily"]:
+                    self.exhausted = True
+                    return False
+
+                wait = self.next_slot - now if self.rpm else 0.0
+                if self.cfg["tpm"]:
+                    while self.token_window and self.token_window[0][0] <= now - 60:
+                        self.token_window.popleft()
+                    used = sum(t for _, t in self.token_window)
+                    if self.token_window and used + tokens > self.cfg["tpm"]:
+                        wait = max(wait, self.token_window[0][0] + 60 - now)
+
+                if wait <= 0:
+                    if self.rpm:
+                        self.next_slot = max(now, self.next_slot) + 60 / self.rpm
+                    self.token_window.append((now, tokens))
+                    self.sent += 1
+                    self.sent_today += 1
+                    return True
+            time.sleep(min(wait, 1.0))
+
+    def on_rate_limit(self):
+        with self.lock:
+            self.rate_limited += 1
+            if self.rpm:
+                self.rpm = max(1.0, self.rpm * BACKOFF_FACTOR)
+                self.next_slot = time.time() + 60 / self.rpm
+
+    def record(self, latency):
+        with self.lock:
+            self.done += 1
+            slow = self.avg_latency is not None and latency > SLOWDOWN_FACTOR * self.avg_latency
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+            if not self.rpm:
+                return
+            if slow:
+                self.rpm = max(1.0, self.rpm * 0.8)
+            else:
+                self.rpm = min(self.max_rpm, self.rpm + RECOVERY_STEP * self.max_rpm) # Recover gradually after a back-off
+
+    def throughput(self):
+        """Requests per second this provider can currently sustain."""
+        limits = []
+        if self.rpm:
+            limits.append(self.rpm / 60)
+        if self.avg_latency:
+            limits.append(self.cfg["concurrency"] / self.avg_latency)
+        return min(limits) if limits else None
+
+    def eta(self):
+        """Seconds until this provider's queue drains at the current rate."""
+        remaining = len(self.queue)
+        if remaining == 0 or self.exhausted:
+            return 0.0
+        rate = self.throughput()
+        return remaining / rate if rate else float("nan")
+
+class CostTracker:
+    """Keeps the run under COST_CEILING, counting reserved spend of in-flight calls."""
+
+    def __init__(self, ceiling):
+        self.ceiling = ceiling
+        self.spent = 0.0
+        self.reserved = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, estimate):
+        with self.lock:
+            if self.spent + self.reserved + estimate > self.ceiling:
+                return False
+            self.reserved += estimate
+            return True
+
+    def settle(self, estimate, actual):
+        with self.lock:
+            self.reserved -= estimate
+            self.spent += actual
+
+# --- PLANNING ---
+
+def plan(results, states, cost_ceiling):
+    """
+    Fills each provider's queue with its pending pairs and returns the pairs deferred by the budget.
+    Queues are in plain question order with the provider's models interleaved, so complete rows
+    land early; no attempt is made to shorten the run by reordering.
+    Paid pairs are admitted in question order until the estimated spend reaches the ceiling.
+    """
+    budget = cost_ceiling
+    deferred = []
+    for row in results:
+        in_tokens = estimate_tokens(eng.SYSTEM_PROMPT + row["question"])
+        for state in states.values():
+            for model in state.cfg["models"]:
+                if eng.is_answered(row["responses"].get(model)):
+                    continue
+                cost = pair_cost(state.cfg, in_tokens, EST_OUTPUT_TOKENS)
+                if cost > budget:
+                    deferred.append((row["question_id"], model))
+                    continue
+                budget -= cost
+                state.queue.append((row["question_id"], model))
+    return deferred
+
+def report_plan(states, deferred, cost_ceiling):
+    print(f"{'PROVIDER':<8} | {'PAIRS':<6} | {'RPM':<6} | {'PLANNED TIME':<12}")
+    print("-" * 42)
+    for state in states.values():
+        rpm = f"{state.rpm:.1f}" if state.rpm else "∞"
+        minutes = len(state.queue) / state.rpm if state.rpm else 0.0
+        print(f"{state.name:<8} | {len(state.queue):<6} | {rpm:<6} | ~{minutes:.1f} min")
+    if deferred:
+        print(f"💸 {len(deferred)} pairs deferred by the ${cost_ceiling:.2f} cost ceiling")
+
+# --- EXECUTION ---
+
+def run(results, states, cost, save):
+    """Runs every queue in parallel and shows a live ETA. Returns pairs left unfinished."""
+    total = sum(len(s.queue) for s in states.values())
+    progress = tqdm(total=total)
+    results_lock = threading.Lock()
+    leftovers = []
+    observed = {"out_tokens": EST_OUTPUT_TOKENS, "completed": 0}
+
+    def skip(question_id, model):
+        with results_lock:
+            leftovers.append((question_id, model))
+        progress.update(1)
+
+    def worker(state):
+        cfg = state.cfg
+        while True:
+            with state.lock:
+                if not state.queue:
+                    return
+                question_id, model = state.queue.popleft()
+            row = results[question_id]
+            in_tokens = estimate_tokens(eng.SYSTEM_PROMPT + row["question"])
+            estimate = pair_cost(cfg, in_tokens, observed["out_tokens"])
+
+            if not cost.reserve(estimate):
+                skip(question_id, model)
+                continue
+            if not state.acquire(in_tokens + observed["out_tokens"]):
+                cost.settle(estimate, 0.0)
+                skip(question_id, model)
+                continue
+            if cfg["daily"]:
+                with results_lock: # Persisted before the call, so a crash never under-counts
+                    save_quota_usage(states)
+
+            start = time.time()
+            backoff = [0.0] # Seconds the helper slept after 429s; not part of the provider's latency
+            if cfg["reports_429"]:
+                def on_rate_limit(seconds):
+                    backoff[0] += seconds
+                    state.on_rate_limit()
+                answer = cfg["call"](row["question"], model, on_rate_limit=on_rate_limit)
+            else:
+                answer = cfg["call"](row["question"], model)
+            state.record(max(0.0, time.time() - start - backoff[0]))
+
+            out_tokens = estimate_tokens(answer or "")
+            cost.settle(estimate, pair_cost(cfg, in_tokens, out_tokens))
+            with results_lock:
+                row["responses"][model] = answer
+                observed["completed"] += 1
+                observed["out_tokens"] = int(0.9 * observed["out_tokens"] + 0.1 * out_tokens)
+                if observed["completed"] % SAVE_EVERY == 0:
+                    save(results)
+            progress.update(1)
+
+    threads = [
+        threading.Thread(target=worker, args=(state,), daemon=True)
+        for state in states.values()
+        for _ in range(state.cfg["concurrency"])
+    ]
+    for t in threads:
+        t.start()
+
+    # Live ETA: the slowest provider's remaining queue at its current (re-planned) rate
+    while any(t.is_alive() for t in threads):
+        eta = max((s.eta() for s in states.values()), default=0.0)
+        backoffs = sum(s.rate_limited for s in states.values())
+        progress.set_postfix(eta_min=f"{eta / 60:.1f}", spent=f"${cost.spent:.2f}", http429=backoffs)
+        time.sleep(1.0)
+    progress.close()
+
+    for state in states.values():
+        if state.exhausted:
+            print(f"⚠️ {state.name} hit its daily quota ({state.cfg['daily']} requests).")
+    return leftovers
+
+# --- MAIN ---
+
+def main():
+    if not os.path.exists(INPUT_FILE):
+        print(f"CRITICAL ERROR: {INPUT_FILE} not found.")
+        return
+
+    with open(INPUT_FILE, "r") as f:
+        questions = json.load(f)
+
+    def save(results):
+        with open(OUTPUT_FILE, "w") as f:
+            json.dump(results, f, indent=4)
+
+    results = eng.load_existing_results(questions, OUTPUT_FILE)
+    quota_usage = load_quota_usage()
+    states = {name: ProviderState(name, cfg, quota_usage.get(name, 0)) for name, cfg in PROVIDERS.items() if cfg["models"]}
+    deferred = plan(results, states, COST_CEILING)
+
+    print(f"🚀 Starting Scheduled Benchmark")
+    print(f"📊 Total Questions: {len(questions)}")
+    report_plan(states, deferred, COST_CEILING)
+    print()
+
+    cost = CostTracker(COST_CEILING)
+    leftovers = run(results, states, cost, save)
+    save(results)
+
+    unfinished = len(deferred) + len(leftovers)
+    print(f"\n✅ Scheduled Benchmark Complete! Spent ~${cost.spent:.2f}. Saved to {OUTPUT_FILE}")
+    if unfinished:
+        print(f"⏭️  {unfinished} pairs left for a later run (quota or cost ceiling).")
+
+if __name__ == "__main__":
+    main()